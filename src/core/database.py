@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import declarative_base, sessionmaker, scoped_session
 
 from src.core.loader import PROJECT_ROOT, load_settings
@@ -15,6 +15,16 @@ engine = create_engine(
         'timeout': 30
     }
 )
+
+
+@event.listens_for(engine, 'connect')
+def _set_sqlite_pragma(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
+
 session_factory = sessionmaker(bind=engine)
 Session = scoped_session(session_factory)
 
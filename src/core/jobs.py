@@ -61,7 +61,7 @@ class JobManager:
     ):
         session = get_session()
         try:
-            job = session.query(Job).filter_by(job_id=job_id).first()
+            job = session.get(Job, job_id)
             if job:
                 job.status = status
                 job.updated_at = datetime.now(get_timezone()).strftime('%Y-%m-%d %H:%M:%S')
@@ -78,7 +78,7 @@ class JobManager:
     def get_job(self, job_id: int) -> dict | None:
         session = get_session()
         try:
-            job = session.query(Job).filter_by(job_id=job_id).first()
+            job = session.get(Job, job_id)
             return job.to_dict() if job else None
         finally:
             session.close()
@@ -14,7 +14,9 @@ def get_timezone() -> ZoneInfo:
     return ZoneInfo(settings['timezone'])
 
 
+@lru_cache(maxsize=1)
 def load_settings() -> Dict[str, Any]:
+    """Load settings.json once per process. Treat the result as read-only."""
     settings_path = PROJECT_ROOT / 'config' / 'settings.json'
     
     if not settings_path.exists():
@@ -4,6 +4,7 @@ from sqlalchemy import Column, String, Float, Text, Integer, Index
 
 from src.core.database import Base
 from src.core.loader import get_timezone
+from src.utils.helpers import round_decimal
 
 def _now_kl():
     return datetime.now(get_timezone()).strftime('%Y-%m-%d %H:%M:%S')
@@ -134,28 +135,25 @@ class KiraPG(Base):
         Index('ix_kira_pg_lookup', 'pg_account_label', 'transaction_date', 'channel', unique=True),
     )
 
-    def _r(self, value):
-        return round(value, 2) if value is not None else None
-
     def to_dict(self) -> dict:
         return {
             'id': self.id,
             'pg_account_label': self.pg_account_label,
             'transaction_date': self.transaction_date,
             'channel': self.channel,
-            'kira_amount': self._r(self.kira_amount),
-            'mdr': self._r(self.mdr),
-            'kira_settlement_amount': self._r(self.kira_settlement_amount),
-            'pg_amount': self._r(self.pg_amount),
+            'kira_amount': round_decimal(self.kira_amount),
+            'mdr': round_decimal(self.mdr),
+            'kira_settlement_amount': round_decimal(self.kira_settlement_amount),
+            'pg_amount': round_decimal(self.pg_amount),
             'volume': self.volume,
             'settlement_rule': self.settlement_rule,
             'settlement_date': self.settlement_date,
             'fee_type': self.fee_type,
-            'fee_rate': self._r(self.fee_rate),
-            'fees': self._r(self.fees),
-            'settlement_amount': self._r(self.settlement_amount),
-            'daily_variance': self._r(self.daily_variance),
-            'cumulative_variance': self._r(self.cumulative_variance),
+            'fee_rate': round_decimal(self.fee_rate),
+            'fees': round_decimal(self.fees),
+            'settlement_amount': round_decimal(self.settlement_amount),
+            'daily_variance': round_decimal(self.daily_variance),
+            'cumulative_variance': round_decimal(self.cumulative_variance),
             'remarks': self.remarks,
             'updated_at': self.updated_at
         }
@@ -199,9 +197,6 @@ class Deposit(Base):
         Index('ix_deposit_lookup', 'merchant', 'transaction_date', unique=True),
     )
 
-    def _r(self, value):
-        return round(value, 2) if value is not None else None
-
     def calculate_fee(self, channel: str, amount: float, volume: int) -> float:
         if channel == 'FPX':
             fee_type = self.fpx_fee_type
@@ -227,27 +222,27 @@ class Deposit(Base):
             'id': self.id,
             'merchant': self.merchant,
             'transaction_date': self.transaction_date,
-            'fpx_amount': self._r(self.fpx_amount),
+            'fpx_amount': round_decimal(self.fpx_amount),
             'fpx_volume': self.fpx_volume,
             'fpx_fee_type': self.fpx_fee_type,
-            'fpx_fee_rate': self._r(self.fpx_fee_rate),
-            'fpx_fee_amount': self._r(self.fpx_fee_amount),
-            'fpx_gross': self._r(self.fpx_gross),
+            'fpx_fee_rate': round_decimal(self.fpx_fee_rate),
+            'fpx_fee_amount': round_decimal(self.fpx_fee_amount),
+            'fpx_gross': round_decimal(self.fpx_gross),
             'fpx_settlement_rule': self.fpx_settlement_rule,
             'fpx_settlement_date': self.fpx_settlement_date,
-            'ewallet_amount': self._r(self.ewallet_amount),
+            'ewallet_amount': round_decimal(self.ewallet_amount),
             'ewallet_volume': self.ewallet_volume,
             'ewallet_fee_type': self.ewallet_fee_type,
-            'ewallet_fee_rate': self._r(self.ewallet_fee_rate),
-            'ewallet_fee_amount': self._r(self.ewallet_fee_amount),
-            'ewallet_gross': self._r(self.ewallet_gross),
+            'ewallet_fee_rate': round_decimal(self.ewallet_fee_rate),
+            'ewallet_fee_amount': round_decimal(self.ewallet_fee_amount),
+            'ewallet_gross': round_decimal(self.ewallet_gross),
             'ewallet_settlement_rule': self.ewallet_settlement_rule,
             'ewallet_settlement_date': self.ewallet_settlement_date,
-            'total_amount': self._r(self.total_amount),
-            'total_fees': self._r(self.total_fees),
-            'available_fpx': self._r(self.available_fpx),
-            'available_ewallet': self._r(self.available_ewallet),
-            'available_total': self._r(self.available_total),
+            'total_amount': round_decimal(self.total_amount),
+            'total_fees': round_decimal(self.total_fees),
+            'available_fpx': round_decimal(self.available_fpx),
+            'available_ewallet': round_decimal(self.available_ewallet),
+            'available_total': round_decimal(self.available_total),
             'remarks': self.remarks,
             'updated_at': self.updated_at
         }
@@ -282,23 +277,20 @@ class MerchantLedger(Base):
         Index('ix_merchant_ledger_lookup', 'merchant', 'transaction_date', unique=True),
     )
 
-    def _round(self, value):
-        return round(value, 2) if value is not None else None
-
     def to_dict(self) -> dict:
         return {
             'id': self.id,
             'merchant': self.merchant,
             'transaction_date': self.transaction_date,
-            'settlement_fund': self._round(self.settlement_fund),
-            'settlement_charges': self._round(self.settlement_charges),
-            'withdrawal_amount': self._round(self.withdrawal_amount),
-            'withdrawal_rate': self._round(self.withdrawal_rate),
-            'withdrawal_charges': self._round(self.withdrawal_charges),
-            'topup_payout_pool': self._round(self.topup_payout_pool),
-            'payout_pool_balance': self._round(self.payout_pool_balance),
-            'available_balance': self._round(self.available_balance),
-            'total_balance': self._round(self.total_balance),
+            'settlement_fund': round_decimal(self.settlement_fund),
+            'settlement_charges': round_decimal(self.settlement_charges),
+            'withdrawal_amount': round_decimal(self.withdrawal_amount),
+            'withdrawal_rate': round_decimal(self.withdrawal_rate),
+            'withdrawal_charges': round_decimal(self.withdrawal_charges),
+            'topup_payout_pool': round_decimal(self.topup_payout_pool),
+            'payout_pool_balance': round_decimal(self.payout_pool_balance),
+            'available_balance': round_decimal(self.available_balance),
+            'total_balance': round_decimal(self.total_balance),
             'remarks': self.remarks,
             'updated_at': self.updated_at
         }
@@ -332,22 +324,19 @@ class AgentLedger(Base):
         Index('ix_agent_ledger_lookup', 'merchant', 'transaction_date', unique=True),
     )
 
-    def _round(self, value):
-        return round(value, 2) if value is not None else None
-
     def to_dict(self) -> dict:
         return {
             'id': self.id,
             'merchant': self.merchant,
             'transaction_date': self.transaction_date,
-            'commission_rate_fpx': self._round(self.commission_rate_fpx),
-            'commission_rate_ewallet': self._round(self.commission_rate_ewallet),
-            'volume': self._round(self.volume),
-            'commission_rate': self._round(self.commission_rate),
-            'commission_amount': self._round(self.commission_amount),
-            'debit': self._round(self.debit),
-            'balance': self._round(self.balance),
-            'accumulative_balance': self._round(self.accumulative_balance),
+            'commission_rate_fpx': round_decimal(self.commission_rate_fpx),
+            'commission_rate_ewallet': round_decimal(self.commission_rate_ewallet),
+            'volume': round_decimal(self.volume),
+            'commission_rate': round_decimal(self.commission_rate),
+            'commission_amount': round_decimal(self.commission_amount),
+            'debit': round_decimal(self.debit),
+            'balance': round_decimal(self.balance),
+            'accumulative_balance': round_decimal(self.accumulative_balance),
             'updated_at': self.updated_at
         }
 
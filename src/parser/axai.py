@@ -23,6 +23,12 @@ class AxaiParser:
         'Payment channels': 'channel'
     }
     
+    DATE_FORMATS = (
+        '%Y-%m-%d %H:%M:%S',
+        '%Y-%m-%d %H:%M',
+        '%d/%m/%Y %H:%M:%S',
+    )
+    
     def parse_file(self, file_path: Path, account_label: str) -> List[dict]:
         df = pd.read_excel(file_path)
         transactions = []
@@ -58,12 +64,7 @@ class AxaiParser:
             return date_value.to_pydatetime().strftime('%Y-%m-%d %H:%M:%S')
         else:
             date_str = str(date_value).strip()
-            formats = [
-                '%Y-%m-%d %H:%M:%S',
-                '%Y-%m-%d %H:%M',
-                '%d/%m/%Y %H:%M:%S',
-            ]
-            for fmt in formats:
+            for fmt in self.DATE_FORMATS:
                 try:
                     dt = datetime.strptime(date_str, fmt)
                     return dt.strftime('%Y-%m-%d %H:%M:%S')
@@ -76,22 +77,23 @@ class AxaiParser:
             return 0
         
         session = get_session()
-        inserted_count = 0
         
         try:
-            for tx in transactions:
-                stmt = insert(PGTransaction).values(
-                    transaction_id=tx['transaction_id'],
-                    transaction_date=tx['transaction_date'],
-                    amount=tx['amount'],
-                    platform='axai',
-                    channel=tx['channel'],
-                    account_label=tx['account_label']
-                ).on_conflict_do_nothing(
-                    index_elements=['transaction_id']
-                )
-                result = session.execute(stmt)
-                inserted_count += result.rowcount
+            stmt = insert(PGTransaction.__table__).on_conflict_do_nothing(
+                index_elements=['transaction_id']
+            )
+            result = session.execute(stmt, [
+                {
+                    'transaction_id': tx['transaction_id'],
+                    'transaction_date': tx['transaction_date'],
+                    'amount': tx['amount'],
+                    'platform': 'axai',
+                    'channel': tx['channel'],
+                    'account_label': tx['account_label']
+                }
+                for tx in transactions
+            ])
+            inserted_count = result.rowcount
             
             session.commit()
             return inserted_count
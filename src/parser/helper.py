@@ -10,24 +10,18 @@ from src.core.logger import get_logger
 
 logger = get_logger(__name__)
 
+CHANNEL_ALIASES = {
+    'wallet': 'ewallet', 'ewallet': 'ewallet', 'e-wallet': 'ewallet',
+    'shopeepay': 'Shopee', 'shopee pay': 'Shopee', 'shopee': 'Shopee',
+    'touch n go': 'TNG', 'touchngo': 'TNG', 'tng': 'TNG', 'touch & go': 'TNG',
+    'boost': 'Boost',
+    'fpx': 'FPX',
+    'fpxc': 'FPXC', 'fpx b2b': 'FPXC',
+}
+
 
 def normalize_channel(channel: str) -> str:
-    channel_lower = channel.lower().strip()
-    
-    if channel_lower in ['wallet', 'ewallet', 'e-wallet']:
-        return 'ewallet'
-    elif channel_lower in ['shopeepay', 'shopee pay', 'shopee']:
-        return 'Shopee'
-    elif channel_lower in ['touch n go', 'touchngo', 'tng', 'touch & go']:
-        return 'TNG'
-    elif channel_lower in ['boost']:
-        return 'Boost'
-    elif channel_lower in ['fpx']:
-        return 'FPX'
-    elif channel_lower in ['fpxc', 'fpx b2b']:
-        return 'FPXC'
-    
-    return channel
+    return CHANNEL_ALIASES.get(channel.lower().strip(), channel)
 
 
 def extract_date_range_from_filename(filename: str) -> Tuple[Optional[str], Optional[str]]:
@@ -43,7 +37,7 @@ def get_parsed_date_ranges(account_label: str = None, platform: str = None) -> S
     parsed_ranges = set()
     
     try:
-        query = session.query(Job).filter(
+        query = session.query(Job.from_date, Job.to_date).filter(
             and_(
                 Job.job_type == 'parse',
                 Job.status == 'completed'
@@ -103,7 +97,7 @@ def start_running_parse_job(job_id: int, run_id: str = None):
     now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
     try:
-        job = session.query(Job).filter_by(job_id=job_id).first()
+        job = session.get(Job, job_id)
         if job:
             job.status = 'running'
             job.updated_at = now
@@ -123,7 +117,7 @@ def complete_parse_job(job_id: int, fetched_count: int, stored_count: int):
     now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
     try:
-        job = session.query(Job).filter_by(job_id=job_id).first()
+        job = session.get(Job, job_id)
         if job:
             job.status = 'completed'
             job.fetched_count = fetched_count
@@ -172,7 +166,7 @@ def fail_parse_job(job_id: int, error: str):
     now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
     try:
-        job = session.query(Job).filter_by(job_id=job_id).first()
+        job = session.get(Job, job_id)
         if job:
             job.status = 'failed'
             job.error_message = error
@@ -15,15 +15,26 @@ logger = get_logger(__name__)
 
 class KiraParser:
     
+    DATE_FORMATS = (
+        '%Y-%m-%d %H:%M:%S',
+        '%Y-%m-%d %H:%M',
+        '%d/%m/%Y %H:%M:%S',
+        '%d/%m/%Y %H:%M',
+    )
+    
     def parse_file(self, file_path: Path) -> List[dict]:
         with warnings.catch_warnings():
             warnings.simplefilter("ignore", UserWarning)
             df = pd.read_excel(file_path, engine='openpyxl')
         transactions = []
+        payment_methods = {}
         
         for _, row in df.iterrows():
             try:
                 mdr_value = row.get('MDR')
+                payment_method = row.get('Payment Method')
+                if payment_method not in payment_methods:
+                    payment_methods[payment_method] = self._normalize_payment_method(payment_method)
                 settlement_value = row.get('Actual Amount')
                 merchant_value = row.get('Merchant')
                 
@@ -31,7 +42,7 @@ class KiraParser:
                     'transaction_id': str(row.get('Transaction ID', '')),
                     'transaction_date': self._parse_date(row.get('Created On')),
                     'amount': float(row.get('Transaction Amount', 0)),
-                    'payment_method': self._normalize_payment_method(row.get('Payment Method')),
+                    'payment_method': payment_methods[payment_method],
                     'mdr': float(mdr_value) if pd.notna(mdr_value) else None,
                     'settlement_amount': float(settlement_value) if pd.notna(settlement_value) else None,
                     'merchant': str(merchant_value).strip() if pd.notna(merchant_value) else None
@@ -69,13 +80,7 @@ class KiraParser:
             return date_value.to_pydatetime().strftime('%Y-%m-%d %H:%M:%S')
         else:
             date_str = str(date_value).strip()
-            formats = [
-                '%Y-%m-%d %H:%M:%S',
-                '%Y-%m-%d %H:%M',
-                '%d/%m/%Y %H:%M:%S',
-                '%d/%m/%Y %H:%M',
-            ]
-            for fmt in formats:
+            for fmt in self.DATE_FORMATS:
                 try:
                     dt = datetime.strptime(date_str, fmt)
                     return dt.strftime('%Y-%m-%d %H:%M:%S')
@@ -88,23 +93,24 @@ class KiraParser:
             return 0
         
         session = get_session()
-        inserted_count = 0
         
         try:
-            for tx in transactions:
-                stmt = insert(KiraTransaction).values(
-                    transaction_id=tx['transaction_id'],
-                    transaction_date=tx['transaction_date'],
-                    amount=tx['amount'],
-                    payment_method=tx['payment_method'],
-                    mdr=tx['mdr'],
-                    settlement_amount=tx['settlement_amount'],
-                    merchant=tx['merchant']
-                ).on_conflict_do_nothing(
-                    index_elements=['transaction_id']
-                )
-                result = session.execute(stmt)
-                inserted_count += result.rowcount
+            stmt = insert(KiraTransaction.__table__).on_conflict_do_nothing(
+                index_elements=['transaction_id']
+            )
+            result = session.execute(stmt, [
+                {
+                    'transaction_id': tx['transaction_id'],
+                    'transaction_date': tx['transaction_date'],
+                    'amount': tx['amount'],
+                    'payment_method': tx['payment_method'],
+                    'mdr': tx['mdr'],
+                    'settlement_amount': tx['settlement_amount'],
+                    'merchant': tx['merchant']
+                }
+                for tx in transactions
+            ])
+            inserted_count = result.rowcount
             
             session.commit()
             return inserted_count
@@ -28,6 +28,13 @@ class M1Parser:
         'Amount': 'amount'
     }
     
+    DATE_FORMATS = (
+        '%H:%M %Y-%m-%d',
+        '%Y-%m-%d %H:%M:%S',
+        '%Y-%m-%d %H:%M',
+        '%d/%m/%Y %H:%M:%S',
+    )
+    
     def parse_file(self, file_path: Path, account_label: str) -> List[dict]:
         filename = file_path.name.lower()
         
@@ -97,14 +104,7 @@ class M1Parser:
         else:
             date_str = str(date_value).strip()
             
-            formats = [
-                '%H:%M %Y-%m-%d',
-                '%Y-%m-%d %H:%M:%S',
-                '%Y-%m-%d %H:%M',
-                '%d/%m/%Y %H:%M:%S',
-            ]
-            
-            for fmt in formats:
+            for fmt in self.DATE_FORMATS:
                 try:
                     dt = datetime.strptime(date_str, fmt)
                     break
@@ -121,22 +121,23 @@ class M1Parser:
             return 0
         
         session = get_session()
-        inserted_count = 0
         
         try:
-            for tx in transactions:
-                stmt = insert(PGTransaction).values(
-                    transaction_id=tx['transaction_id'],
-                    transaction_date=tx['transaction_date'],
-                    amount=tx['amount'],
-                    platform='m1',
-                    channel=tx['channel'],
-                    account_label=tx['account_label']
-                ).on_conflict_do_nothing(
-                    index_elements=['transaction_id']
-                )
-                result = session.execute(stmt)
-                inserted_count += result.rowcount
+            stmt = insert(PGTransaction.__table__).on_conflict_do_nothing(
+                index_elements=['transaction_id']
+            )
+            result = session.execute(stmt, [
+                {
+                    'transaction_id': tx['transaction_id'],
+                    'transaction_date': tx['transaction_date'],
+                    'amount': tx['amount'],
+                    'platform': 'm1',
+                    'channel': tx['channel'],
+                    'account_label': tx['account_label']
+                }
+                for tx in transactions
+            ])
+            inserted_count = result.rowcount
             
             session.commit()
             return inserted_count
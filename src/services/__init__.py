@@ -1,8 +1,8 @@
 from src.services.client import SheetsClient
 from src.services.kira_pg import KiraPGSheetService, init_kira_pg
 from src.services.deposit import DepositSheetService, init_deposit
-from src.services.merchant_ledger import MerchantLedgerSheetService, init_merchant_ledger
-from src.services.agent_ledger import AgentLedgerSheetService, init_agent_ledger
+from src.services.merchant_ledger import MerchantLedgerSheetService, init_merchant_ledgers
+from src.services.agent_ledger import AgentLedgerSheetService, init_agent_ledgers
 from src.services.parameters import ParameterService
 
 __all__ = [
@@ -12,8 +12,8 @@ __all__ = [
     'DepositSheetService',
     'init_deposit',
     'MerchantLedgerSheetService',
-    'init_merchant_ledger',
+    'init_merchant_ledgers',
     'AgentLedgerSheetService',
-    'init_agent_ledger',
+    'init_agent_ledgers',
     'ParameterService',
 ]
@@ -26,7 +26,7 @@ def get_active_accounts() -> List[Account]:
 def get_account_by_id(account_id: int) -> Optional[Account]:
     session = get_session()
     try:
-        return session.query(Account).filter(Account.account_id == account_id).first()
+        return session.get(Account, account_id)
     finally:
         session.close()
 
@@ -93,7 +93,7 @@ def create_account(data: Dict[str, Any]) -> Account:
 def update_account(account_id: int, data: Dict[str, Any]) -> Optional[Account]:
     session = get_session()
     try:
-        account = session.query(Account).filter(Account.account_id == account_id).first()
+        account = session.get(Account, account_id)
         if not account:
             return None
         
@@ -127,7 +127,7 @@ def update_account(account_id: int, data: Dict[str, Any]) -> Optional[Account]:
 def delete_account(account_id: int) -> bool:
     session = get_session()
     try:
-        account = session.query(Account).filter(Account.account_id == account_id).first()
+        account = session.get(Account, account_id)
         if not account:
             return False
         
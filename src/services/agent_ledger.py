@@ -1,14 +1,15 @@
-from typing import Dict, List, Any, Optional
-from calendar import monthrange
+from typing import Dict, List, Any, Optional, Set, Tuple
+from operator import attrgetter, itemgetter
 import re
 
-from sqlalchemy import and_
+from sqlalchemy import and_, case, update
 
 from src.core.database import get_session
 from src.core.models import AgentLedger, Deposit
 from src.core.logger import get_logger
-from src.services.client import SheetsClient
-from src.utils.helpers import round_decimal, to_float, safe_get_value, parse_period, MONTHS
+from src.services.client import SheetsClient, get_sheets_client
+from src.services.ledger_summary import SummarySheetService
+from src.utils.helpers import round_decimal, to_float, safe_get_value, parse_period, month_bounds, missing_month_dates, missing_days_insert, insert_missing_days, MONTHS
 
 logger = get_logger(__name__)
 
@@ -16,30 +17,83 @@ AGENT_LEDGER_SHEET = 'Agents Balance & Settlement Ledger'
 DATA_START_ROW = 5
 DATA_RANGE = 'A5:Q50'
 
-
-
-def init_agent_ledger(merchant: str, year: int, month: int):
+SHEET_COLUMNS = (
+    ('id', ''),
+    ('transaction_date', ''),
+    ('commission_rate_fpx', ''),
+    ('fpx_commission', 0),
+    ('commission_rate_ewallet', ''),
+    ('ewallet_commission', 0),
+    ('gross_amount', 0),
+    ('available_fpx', 0),
+    ('available_ewallet', 0),
+    ('available_total', 0),
+    ('volume', ''),
+    ('commission_rate', ''),
+    ('commission_amount', 0),
+    ('debit', ''),
+    ('balance', 0),
+    ('accumulative_balance', 0),
+    ('updated_at', ''),
+)
+SHEET_DEFAULTS = tuple(default for _, default in SHEET_COLUMNS)
+_sheet_row = itemgetter(*(column for column, _ in SHEET_COLUMNS))
+
+DEPOSIT_COLUMNS = (
+    Deposit.transaction_date,
+    Deposit.fpx_amount,
+    Deposit.fpx_settlement_date,
+    Deposit.ewallet_amount,
+    Deposit.ewallet_settlement_date,
+)
+
+MANUAL_INPUT_FIELDS = (
+    'commission_rate_fpx',
+    'commission_rate_ewallet',
+    'volume',
+    'commission_rate',
+    'debit',
+)
+
+BALANCE_COLUMNS = (
+    'available_fpx',
+    'available_ewallet',
+    'available_total',
+    'balance',
+    'accumulative_balance',
+)
+_balance_row = attrgetter(*BALANCE_COLUMNS)
+
+
+def init_agent_ledgers(periods: List[Tuple[str, int, int]]):
     session = get_session()
     
     try:
-        date_prefix = f"{year}-{month:02d}"
-        _, last_day = monthrange(year, month)
-        
-        existing = session.query(AgentLedger.transaction_date).filter(
-            and_(
-                AgentLedger.merchant == merchant,
-                AgentLedger.transaction_date.like(f"{date_prefix}%")
-            )
+        existing = session.query(AgentLedger.merchant, AgentLedger.transaction_date).filter(
+            AgentLedger.merchant.in_({merchant for merchant, _, _ in periods})
         ).all()
+        existing_dates: Dict[str, Set[str]] = {}
+        for rec in existing:
+            existing_dates.setdefault(rec.merchant, set()).add(rec.transaction_date)
         
-        existing_dates = {rec[0] for rec in existing}
-        
-        for day in range(1, last_day + 1):
-            date_str = f"{year}-{month:02d}-{day:02d}"
-            if date_str not in existing_dates:
-                session.add(AgentLedger(merchant=merchant, transaction_date=date_str))
+        missing = []
+        for merchant, year, month in periods:
+            merchant_dates = existing_dates.setdefault(merchant, set())
+            try:
+                missing_dates = missing_month_dates(merchant_dates, year, month)
+            except Exception as e:
+                logger.error(f"Failed to init agent ledger for {merchant} {year}-{month}: {e}")
+                continue
+            merchant_dates.update(missing_dates)
+            missing.extend(
+                {'merchant': merchant, 'transaction_date': date_str}
+                for date_str in missing_dates
+            )
         
+        if missing:
+            session.execute(missing_days_insert(AgentLedger, 'merchant'), missing)
         session.commit()
+        SummarySheetService.clear_cache()
         
     except Exception as e:
         session.rollback()
@@ -63,16 +117,14 @@ def _aggregate_by_settlement(deposits, date_prefix: str, ledger_map: dict):
         if dep.fpx_settlement_date and dep.fpx_amount and rate_fpx:
             if dep.fpx_settlement_date.startswith(date_prefix):
                 fpx_commission = round_decimal((dep.fpx_amount or 0) * rate_fpx / 100)
-                if dep.fpx_settlement_date not in fpx_by_settlement:
-                    fpx_by_settlement[dep.fpx_settlement_date] = 0
-                fpx_by_settlement[dep.fpx_settlement_date] += fpx_commission or 0
+                settlement_date = dep.fpx_settlement_date
+                fpx_by_settlement[settlement_date] = fpx_by_settlement.get(settlement_date, 0) + (fpx_commission or 0)
 
         if dep.ewallet_settlement_date and dep.ewallet_amount and rate_ewallet:
             if dep.ewallet_settlement_date.startswith(date_prefix):
                 ewallet_commission = round_decimal((dep.ewallet_amount or 0) * rate_ewallet / 100)
-                if dep.ewallet_settlement_date not in ewallet_by_settlement:
-                    ewallet_by_settlement[dep.ewallet_settlement_date] = 0
-                ewallet_by_settlement[dep.ewallet_settlement_date] += ewallet_commission or 0
+                settlement_date = dep.ewallet_settlement_date
+                ewallet_by_settlement[settlement_date] = ewallet_by_settlement.get(settlement_date, 0) + (ewallet_commission or 0)
 
     return fpx_by_settlement, ewallet_by_settlement
 
@@ -84,12 +136,13 @@ def _get_previous_month_accum_balance(session, merchant: str, year: int, month:
         prev_month = 12
         prev_year = year - 1
 
-    prev_date_prefix = f"{prev_year}-{prev_month:02d}"
+    prev_start, prev_end = month_bounds(prev_year, prev_month)
 
-    last_record = session.query(AgentLedger).filter(
+    last_record = session.query(AgentLedger.accumulative_balance).filter(
         and_(
             AgentLedger.merchant == merchant,
-            AgentLedger.transaction_date.like(f"{prev_date_prefix}%")
+            AgentLedger.transaction_date >= prev_start,
+            AgentLedger.transaction_date < prev_end
         )
     ).order_by(AgentLedger.transaction_date.desc()).first()
 
@@ -98,43 +151,58 @@ def _get_previous_month_accum_balance(session, merchant: str, year: int, month:
 
 def _recalculate_balances(session, merchant: str, year: int, month: int,
                           fpx_by_settlement: dict, ewallet_by_settlement: dict):
-    date_prefix = f"{year}-{month:02d}"
+    month_start, month_end = month_bounds(year, month)
 
     prev_accum = _get_previous_month_accum_balance(session, merchant, year, month)
 
-    rows = session.query(AgentLedger).filter(
+    rows = session.query(
+        AgentLedger.id,
+        AgentLedger.transaction_date,
+        AgentLedger.commission_amount,
+        AgentLedger.debit,
+        *(getattr(AgentLedger, column) for column in BALANCE_COLUMNS),
+    ).filter(
         and_(
             AgentLedger.merchant == merchant,
-            AgentLedger.transaction_date.like(f"{date_prefix}%")
+            AgentLedger.transaction_date >= month_start,
+            AgentLedger.transaction_date < month_end
         )
     ).order_by(AgentLedger.transaction_date).all()
 
+    mappings = []
     for row in rows:
         date = row.transaction_date
-        rate_fpx = row.commission_rate_fpx or 0
-        rate_ewallet = row.commission_rate_ewallet or 0
 
         avail_fpx = fpx_by_settlement.get(date, 0)
         avail_ewallet = ewallet_by_settlement.get(date, 0)
 
         available_total = avail_fpx + avail_ewallet
         
-        row.available_fpx = avail_fpx if avail_fpx > 0 else None
-        row.available_ewallet = avail_ewallet if avail_ewallet > 0 else None
-        row.available_total = round_decimal(available_total) if available_total > 0 else None
-        
         commission_amount = row.commission_amount or 0
         debit = row.debit or 0
 
         has_activity = available_total > 0 or commission_amount > 0 or debit > 0 or prev_accum != 0
 
         if has_activity:
-            row.balance = round_decimal(available_total + commission_amount - debit)
-            row.accumulative_balance = round_decimal(prev_accum + row.balance)
-            prev_accum = row.accumulative_balance
+            balance = round_decimal(available_total + commission_amount - debit)
+            accumulative_balance = round_decimal(prev_accum + balance)
+            prev_accum = accumulative_balance
         else:
-            row.balance = None
-            row.accumulative_balance = None
+            balance = None
+            accumulative_balance = None
+
+        balances = (
+            avail_fpx if avail_fpx > 0 else None,
+            avail_ewallet if avail_ewallet > 0 else None,
+            round_decimal(available_total) if available_total > 0 else None,
+            balance,
+            accumulative_balance,
+        )
+        if balances != _balance_row(row):
+            mappings.append({'id': row.id, **dict(zip(BALANCE_COLUMNS, balances))})
+
+    if mappings:
+        session.bulk_update_mappings(AgentLedger, mappings)
 
 
 class AgentLedgerSheetService:
@@ -143,7 +211,7 @@ class AgentLedgerSheetService:
     @classmethod
     def get_client(cls) -> SheetsClient:
         if cls._client is None:
-            cls._client = SheetsClient()
+            cls._client = get_sheets_client()
         return cls._client
     
     @classmethod
@@ -166,27 +234,38 @@ class AgentLedgerSheetService:
         if not year or not month:
             raise ValueError("Invalid period format")
 
-        init_agent_ledger(merchant, year, month)
-
         session = get_session()
 
         try:
             manual_inputs = cls._read_manual_inputs()
+
+            insert_missing_days(session, AgentLedger, 'merchant', merchant, year, month)
             cls._apply_manual_inputs(session, manual_inputs)
 
             date_prefix = f"{year}-{month:02d}"
-            deposits = session.query(Deposit).filter(
+            month_start, month_end = month_bounds(year, month)
+            deposits = session.query(*DEPOSIT_COLUMNS).filter(
                 and_(
                     Deposit.merchant == merchant,
-                    Deposit.transaction_date.like(f"{date_prefix}%")
+                    Deposit.transaction_date >= month_start,
+                    Deposit.transaction_date < month_end
                 )
             ).all()
 
             prev_deposits = cls._get_prev_month_deposits(session, merchant, year, month)
             all_deposits = list(prev_deposits) + list(deposits)
             
-            ledgers = session.query(AgentLedger).filter(
-                AgentLedger.merchant == merchant
+            ledger_start = min((d.transaction_date for d in all_deposits), default=month_start)
+            ledgers = session.query(
+                AgentLedger.transaction_date,
+                AgentLedger.commission_rate_fpx,
+                AgentLedger.commission_rate_ewallet,
+            ).filter(
+                and_(
+                    AgentLedger.merchant == merchant,
+                    AgentLedger.transaction_date >= ledger_start,
+                    AgentLedger.transaction_date < month_end
+                )
             ).all()
             ledger_map = {lg.transaction_date: lg for lg in ledgers}
 
@@ -194,6 +273,7 @@ class AgentLedgerSheetService:
 
             _recalculate_balances(session, merchant, year, month, fpx_by_settlement, ewallet_by_settlement)
             session.commit()
+            SummarySheetService.clear_cache()
 
             data = cls._get_ledger_data(session, merchant, year, month, fpx_by_settlement, ewallet_by_settlement)
             cls._write_to_sheet(data)
@@ -217,12 +297,13 @@ class AgentLedgerSheetService:
             prev_month = 12
             prev_year = year - 1
 
-        prev_date_prefix = f"{prev_year}-{prev_month:02d}"
+        prev_start, prev_end = month_bounds(prev_year, prev_month)
 
-        return session.query(Deposit).filter(
+        return session.query(*DEPOSIT_COLUMNS).filter(
             and_(
                 Deposit.merchant == merchant,
-                Deposit.transaction_date.like(f"{prev_date_prefix}%")
+                Deposit.transaction_date >= prev_start,
+                Deposit.transaction_date < prev_end
             )
         ).all()
     
@@ -259,28 +340,47 @@ class AgentLedgerSheetService:
         if not manual_inputs:
             return 0
         
-        ids = [m['id'] for m in manual_inputs]
-        records = session.query(AgentLedger).filter(AgentLedger.id.in_(ids)).all()
-        records_by_id = {rec.id: rec for rec in records}
-        
-        count = 0
+        values_by_id = {}
         for input_data in manual_inputs:
-            record = records_by_id.get(input_data['id'])
-            if not record:
-                continue
+            volume = input_data['volume']
+            commission_rate = input_data['commission_rate']
             
-            record.commission_rate_fpx = input_data['commission_rate_fpx']
-            record.commission_rate_ewallet = input_data['commission_rate_ewallet']
-            record.volume = input_data['volume']
-            record.commission_rate = input_data['commission_rate']
-            record.debit = input_data['debit']
-            
-            if record.volume and record.commission_rate:
-                record.commission_amount = round_decimal(record.volume * record.commission_rate / 100)
+            if volume and commission_rate:
+                commission_amount = round_decimal(volume * commission_rate / 100)
             else:
-                record.commission_amount = None
+                commission_amount = None
             
-            count += 1
+            values_by_id[input_data['id']] = {
+                **{field: input_data[field] for field in MANUAL_INPUT_FIELDS},
+                'commission_amount': commission_amount,
+            }
+        
+        columns = MANUAL_INPUT_FIELDS + ('commission_amount',)
+        current = session.query(
+            AgentLedger.id,
+            *(getattr(AgentLedger, column) for column in columns)
+        ).filter(AgentLedger.id.in_(list(values_by_id))).all()
+        changed = {
+            row.id: values_by_id[row.id]
+            for row in current
+            if tuple(values_by_id[row.id][column] for column in columns) != tuple(row[1:])
+        }
+        
+        count = 0
+        if changed:
+            result = session.execute(
+                update(AgentLedger)
+                .where(AgentLedger.id.in_(list(changed)))
+                .values({
+                    column: case(
+                        {record_id: values[column] for record_id, values in changed.items()},
+                        value=AgentLedger.id
+                    )
+                    for column in columns
+                })
+                .execution_options(synchronize_session=False)
+            )
+            count = result.rowcount
         
         logger.info(f"Applied {count} manual inputs to Agent Ledger")
         return count
@@ -288,26 +388,28 @@ class AgentLedgerSheetService:
     @classmethod
     def _get_ledger_data(cls, session, merchant: str, year: int, month: int,
                          fpx_by_settlement: dict, ewallet_by_settlement: dict) -> List[Dict]:
-        date_prefix = f"{year}-{month:02d}"
+        month_start, month_end = month_bounds(year, month)
         
-        deposits = session.query(Deposit).filter(
+        deposits = session.query(*DEPOSIT_COLUMNS).filter(
             and_(
                 Deposit.merchant == merchant,
-                Deposit.transaction_date.like(f"{date_prefix}%")
+                Deposit.transaction_date >= month_start,
+                Deposit.transaction_date < month_end
             )
         ).order_by(Deposit.transaction_date).all()
         
         ledgers = session.query(AgentLedger).filter(
             and_(
                 AgentLedger.merchant == merchant,
-                AgentLedger.transaction_date.like(f"{date_prefix}%")
+                AgentLedger.transaction_date >= month_start,
+                AgentLedger.transaction_date < month_end
             )
         ).order_by(AgentLedger.transaction_date).all()
         
         deposit_map = {d.transaction_date: d for d in deposits}
         ledger_map = {lg.transaction_date: lg for lg in ledgers}
         
-        all_dates = set(deposit_map.keys()) | set(ledger_map.keys())
+        all_dates = deposit_map.keys() | ledger_map.keys()
         
         result = []
         for date in sorted(all_dates):
@@ -383,29 +485,12 @@ class AgentLedgerSheetService:
     def _write_to_sheet(cls, data: List[Dict]):
         client = cls.get_client()
         
-        rows = []
-        for rec in data:
-            rows.append([
-                rec.get('id', ''),
-                rec.get('transaction_date', ''),
-                rec.get('commission_rate_fpx') if rec.get('commission_rate_fpx') is not None else '',
-                rec.get('fpx_commission') if rec.get('fpx_commission') is not None else 0,
-                rec.get('commission_rate_ewallet') if rec.get('commission_rate_ewallet') is not None else '',
-                rec.get('ewallet_commission') if rec.get('ewallet_commission') is not None else 0,
-                rec.get('gross_amount') if rec.get('gross_amount') is not None else 0,
-                rec.get('available_fpx') if rec.get('available_fpx') is not None else 0,
-                rec.get('available_ewallet') if rec.get('available_ewallet') is not None else 0,
-                rec.get('available_total') if rec.get('available_total') is not None else 0,
-                rec.get('volume') if rec.get('volume') is not None else '',
-                rec.get('commission_rate') if rec.get('commission_rate') is not None else '',
-                rec.get('commission_amount') if rec.get('commission_amount') is not None else 0,
-                rec.get('debit') if rec.get('debit') is not None else '',
-                rec.get('balance') if rec.get('balance') is not None else 0,
-                rec.get('accumulative_balance') if rec.get('accumulative_balance') is not None else 0,
-                rec.get('updated_at') or '',
-            ])
+        rows = [
+            [default if value is None else value for value, default in zip(_sheet_row(rec), SHEET_DEFAULTS)]
+            for rec in data
+        ]
         
-        worksheet = client.spreadsheet.worksheet(AGENT_LEDGER_SHEET)
+        worksheet = client.worksheet(AGENT_LEDGER_SHEET)
         worksheet.batch_clear([DATA_RANGE])
         
         if rows:
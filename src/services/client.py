@@ -1,7 +1,9 @@
+from functools import lru_cache
+
 import gspread
 from gspread.auth import authorize
 from google.oauth2.service_account import Credentials
-from typing import List, Any
+from typing import Dict, List, Any
 
 from src.core.logger import get_logger
 from src.core.loader import get_service_account_path, get_spreadsheet_id, load_settings
@@ -29,11 +31,19 @@ class SheetsClient:
         
         self.client = authorize(credentials)
         self.spreadsheet = self.client.open_by_key(self.spreadsheet_id)
+        self._worksheets: Dict[str, gspread.Worksheet] = {}
+    
+    def worksheet(self, sheet_name: str) -> gspread.Worksheet:
+        worksheet = self._worksheets.get(sheet_name)
+        if worksheet is None:
+            worksheet = self.spreadsheet.worksheet(sheet_name)
+            self._worksheets[sheet_name] = worksheet
+        return worksheet
     
     @exponential_backoff()
     def write_data(self, sheet_name: str, data: List[List[Any]], start_cell: str = 'A1'):
         try:
-            worksheet = self.spreadsheet.worksheet(sheet_name)
+            worksheet = self.worksheet(sheet_name)
             worksheet.update(start_cell, data)
         except Exception as e:
             logger.error(f"Failed to write to {sheet_name}: {e}")
@@ -42,7 +52,7 @@ class SheetsClient:
     @exponential_backoff()
     def read_data(self, sheet_name: str, range_spec: str = '') -> List[List[Any]]:
         try:
-            worksheet = self.spreadsheet.worksheet(sheet_name)
+            worksheet = self.worksheet(sheet_name)
             if range_spec:
                 values = worksheet.get(range_spec)
             else:
@@ -55,7 +65,7 @@ class SheetsClient:
     @exponential_backoff()
     def set_dropdown(self, sheet_name: str, cell: str, values: List[str]):
         try:
-            worksheet = self.spreadsheet.worksheet(sheet_name)
+            worksheet = self.worksheet(sheet_name)
             
             col = ''.join(filter(str.isalpha, cell))
             row = int(''.join(filter(str.isdigit, cell)))
@@ -92,7 +102,7 @@ class SheetsClient:
     @exponential_backoff()
     def set_dropdown_range(self, sheet_name: str, col: str, start_row: int, end_row: int, values: List[str]):
         try:
-            worksheet = self.spreadsheet.worksheet(sheet_name)
+            worksheet = self.worksheet(sheet_name)
             
             col_num = sum((ord(c.upper()) - ord('A') + 1) * (26 ** i) 
                          for i, c in enumerate(reversed(col)))
@@ -126,7 +136,7 @@ class SheetsClient:
     @exponential_backoff()
     def clear_data_validation(self, sheet_name: str, range_spec: str):
         try:
-            worksheet = self.spreadsheet.worksheet(sheet_name)
+            worksheet = self.worksheet(sheet_name)
             sheet_id = worksheet.id
 
             start_cell, end_cell = range_spec.split(':')
@@ -162,7 +172,7 @@ class SheetsClient:
     def set_row_background(self, sheet_name: str, row: int, start_col: int, end_col: int, 
                            red: float = 0.9, green: float = 0.9, blue: float = 0.9):
         try:
-            worksheet = self.spreadsheet.worksheet(sheet_name)
+            worksheet = self.worksheet(sheet_name)
             sheet_id = worksheet.id
             
             request = {
@@ -194,7 +204,7 @@ class SheetsClient:
     @exponential_backoff()
     def clear_row_backgrounds(self, sheet_name: str, start_row: int, end_row: int, start_col: int, end_col: int):
         try:
-            worksheet = self.spreadsheet.worksheet(sheet_name)
+            worksheet = self.worksheet(sheet_name)
             sheet_id = worksheet.id
 
             request = {
@@ -224,3 +234,7 @@ class SheetsClient:
             logger.error(f"Failed to clear row backgrounds in {sheet_name}: {e}")
 
 
+@lru_cache(maxsize=1)
+def get_sheets_client() -> SheetsClient:
+    """Shared client so every sheet service authorizes and opens the spreadsheet once."""
+    return SheetsClient()
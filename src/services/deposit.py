@@ -1,22 +1,40 @@
 from typing import Dict, List, Any, Optional, Set
 from calendar import monthrange
+from functools import lru_cache
+from operator import attrgetter
 import re
 
-from sqlalchemy import func
+from sqlalchemy import func, or_
+from sqlalchemy.dialects.sqlite import insert
 
 from src.core.database import get_session
 from src.core.models import Deposit, KiraTransaction
 from src.core.logger import get_logger
-from src.services.client import SheetsClient
+from src.services.client import SheetsClient, get_sheets_client
+from src.services.ledger_summary import SummarySheetService
 from src.services.parameters import ParameterService
-from src.utils.helpers import categorize_channel, round_decimal, to_float, calculate_fee, safe_get_value, parse_period, MONTHS
-from src.utils.holiday import load_malaysia_holidays, calculate_settlement_date
+from src.utils.helpers import categorize_channel_expr, round_decimal, to_float, calculate_fee, safe_get_value, parse_period, month_bounds, MONTHS
+from src.utils.holiday import load_malaysia_holidays, merge_holidays, calculate_settlement_date
 
 logger = get_logger(__name__)
 
 DEPOSIT_SHEET = 'Deposit'
 DATA_START_ROW = 7
 DATA_RANGE = 'A7:X50'
+AGGREGATE_YIELD_PER = 1000
+
+MANUAL_COLUMNS = (
+    'fpx_fee_type',
+    'fpx_fee_rate',
+    'fpx_settlement_rule',
+    'ewallet_fee_type',
+    'ewallet_fee_rate',
+    'ewallet_settlement_rule',
+    'remarks',
+)
+NO_MANUAL_COLUMNS = (None,) * len(MANUAL_COLUMNS)
+_manual_columns = attrgetter(*MANUAL_COLUMNS)
+NO_TRANSACTIONS = {'amount': 0, 'volume': 0}
 
 
 
@@ -25,9 +43,9 @@ def init_deposit():
     
     try:
         params = ParameterService.load_parameters()
-        add_on_holidays = params['add_on_holidays']
-        exclude_holidays = params['exclude_holidays']
-        public_holidays = load_malaysia_holidays()
+        holidays = merge_holidays(
+            load_malaysia_holidays(), params['add_on_holidays'], params['exclude_holidays']
+        )
         
         merchants = session.query(KiraTransaction.merchant).distinct().all()
         merchants = [m[0] for m in merchants if m[0]]
@@ -40,64 +58,69 @@ def init_deposit():
         if not merchants or not year_months:
             return
         
-        existing = session.query(Deposit).all()
+        existing = session.query(
+            Deposit.merchant,
+            Deposit.transaction_date,
+            *(getattr(Deposit, column) for column in MANUAL_COLUMNS)
+        ).yield_per(AGGREGATE_YIELD_PER)
         existing_map = {(e.merchant, e.transaction_date): e for e in existing}
         
+        kira_channel = categorize_channel_expr(KiraTransaction.payment_method)
+        kira_agg = session.query(
+            KiraTransaction.merchant,
+            func.substr(KiraTransaction.transaction_date, 1, 10).label('tx_date'),
+            kira_channel.label('channel'),
+            func.sum(KiraTransaction.amount).label('amount'),
+            func.sum(KiraTransaction.settlement_amount).label('settlement_amount'),
+            func.count().label('volume'),
+        ).group_by(
+            KiraTransaction.merchant,
+            func.substr(KiraTransaction.transaction_date, 1, 10),
+            kira_channel
+        ).yield_per(AGGREGATE_YIELD_PER)
+        
+        tx_map: Dict[tuple, Dict] = {
+            (row.merchant, row.tx_date, row.channel): {
+                'amount': row.amount or 0,
+                'settlement_amount': row.settlement_amount or 0,
+                'volume': row.volume or 0,
+            }
+            for row in kira_agg
+        }
+        
+        records: List[Dict[str, Any]] = []
+        records_by_merchant: Dict[str, List[Dict[str, Any]]] = {m: [] for m in merchants}
+        settlement_maps = {m: ({}, {}) for m in merchants}
+        
         count = 0
         for ym in sorted(year_months):
             year = int(ym[:4])
             month = int(ym[5:7])
             _, last_day = monthrange(year, month)
-            date_prefix = f"{year}-{month:02d}"
+            month_dates = [f"{year}-{month:02d}-{day:02d}" for day in range(1, last_day + 1)]
             
             for merchant in merchants:
-                kira_agg = session.query(
-                    func.substr(KiraTransaction.transaction_date, 1, 10).label('tx_date'),
-                    KiraTransaction.payment_method,
-                    func.sum(KiraTransaction.amount).label('amount'),
-                    func.sum(KiraTransaction.settlement_amount).label('settlement_amount'),
-                    func.count().label('volume'),
-                ).filter(
-                    KiraTransaction.merchant == merchant,
-                    KiraTransaction.transaction_date.like(f"{date_prefix}%")
-                ).group_by(
-                    func.substr(KiraTransaction.transaction_date, 1, 10),
-                    KiraTransaction.payment_method
-                ).all()
+                fpx_settlement, ewallet_settlement = settlement_maps[merchant]
+                merchant_records = records_by_merchant[merchant]
                 
-                tx_map: Dict[tuple, Dict] = {}
-                for row in kira_agg:
-                    channel = categorize_channel(row.payment_method)
-                    key = (row.tx_date, channel)
-                    if key not in tx_map:
-                        tx_map[key] = {'amount': 0, 'settlement_amount': 0, 'volume': 0}
-                    tx_map[key]['amount'] += row.amount or 0
-                    tx_map[key]['settlement_amount'] += row.settlement_amount or 0
-                    tx_map[key]['volume'] += row.volume or 0
-                
-                for day in range(1, last_day + 1):
-                    date_str = f"{year}-{month:02d}-{day:02d}"
-                    
-                    fpx_data = tx_map.get((date_str, 'FPX'), {'amount': 0, 'volume': 0})
-                    ewallet_data = tx_map.get((date_str, 'EWALLET'), {'amount': 0, 'volume': 0})
+                for date_str in month_dates:
+                    fpx_data = tx_map.get((merchant, date_str, 'FPX'), NO_TRANSACTIONS)
+                    ewallet_data = tx_map.get((merchant, date_str, 'EWALLET'), NO_TRANSACTIONS)
                     
                     existing_record = existing_map.get((merchant, date_str))
                     
-                    fpx_fee_type = existing_record.fpx_fee_type if existing_record else None
-                    fpx_fee_rate = existing_record.fpx_fee_rate if existing_record else None
-                    ewallet_fee_type = existing_record.ewallet_fee_type if existing_record else None
-                    ewallet_fee_rate = existing_record.ewallet_fee_rate if existing_record else None
-                    remarks = existing_record.remarks if existing_record else None
-                    
-                    fpx_rule = existing_record.fpx_settlement_rule if existing_record else None
-                    ewallet_rule = existing_record.ewallet_settlement_rule if existing_record else None
+                    (
+                        fpx_fee_type, fpx_fee_rate, fpx_rule,
+                        ewallet_fee_type, ewallet_fee_rate, ewallet_rule,
+                        remarks,
+                    ) = _manual_columns(existing_record) if existing_record else NO_MANUAL_COLUMNS
                     
                     fpx_settlement_date = calculate_settlement_date(
-                        date_str, fpx_rule, public_holidays, add_on_holidays, exclude_holidays
+                        date_str, fpx_rule, holidays
                     ) if fpx_rule else None
                     
                     ewallet_settlement_date = calculate_settlement_date(
-                        date_str, ewallet_rule, public_holidays, add_on_holidays, exclude_holidays
+                        date_str, ewallet_rule, holidays
                     ) if ewallet_rule else None
                     
                     fpx_fee_amount = calculate_fee(
@@ -134,19 +157,37 @@ def init_deposit():
                         'remarks': remarks,
                     }
                     
-                    if existing_record:
-                        for attr, value in record_data.items():
-                            setattr(existing_record, attr, value)
-                    else:
-                        session.add(Deposit(**record_data))
+                    records.append(record_data)
+                    merchant_records.append(record_data)
+                    _add_settlement(fpx_settlement, date_str, fpx_settlement_date, record_data['fpx_gross'])
+                    _add_settlement(ewallet_settlement, date_str, ewallet_settlement_date, record_data['ewallet_gross'])
                     
                     count += 1
-                
-                _calculate_available_settlements(
-                    session, merchant, year, month, public_holidays, add_on_holidays, exclude_holidays
-                )
+        
+        for merchant, merchant_records in records_by_merchant.items():
+            fpx_settlement, ewallet_settlement = settlement_maps[merchant]
+            for record in merchant_records:
+                (
+                    record['available_fpx'],
+                    record['available_ewallet'],
+                    record['available_total'],
+                ) = _available_settlements(record['transaction_date'], fpx_settlement, ewallet_settlement)
+        
+        if records:
+            value_columns = [col for col in records[0] if col not in ('merchant', 'transaction_date')]
+            stmt = insert(Deposit)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['merchant', 'transaction_date'],
+                set_={col: stmt.excluded[col] for col in value_columns + ['updated_at']},
+                where=or_(*(
+                    getattr(Deposit, col).is_distinct_from(stmt.excluded[col])
+                    for col in value_columns
+                ))
+            )
+            session.execute(stmt, records)
         
         session.commit()
+        SummarySheetService.clear_cache()
         logger.info(f"Initialized {count} deposit records")
         
     except Exception as e:
@@ -157,53 +198,72 @@ def init_deposit():
         session.close()
 
 
-def _calculate_available_settlements(
-    session, merchant: str, year: int, month: int,
-    public_holidays: Set[str], add_on_holidays: Set[str], exclude_holidays: Set[str] = None
-):
-    date_prefix = f"{year}-{month:02d}"
-    
-    deposits = session.query(Deposit).filter(
-        Deposit.merchant == merchant,
-        Deposit.transaction_date.like(f"{date_prefix}%")
-    ).all()
+def _calculate_available_settlements(session, merchant: str, year: int, month: int, holidays: Set[str]):
+    month_start, month_end = month_bounds(year, month)
     
     prev_month = month - 1
     prev_year = year
     if prev_month == 0:
         prev_month = 12
         prev_year = year - 1
-    prev_date_prefix = f"{prev_year}-{prev_month:02d}"
+    prev_start, _ = month_bounds(prev_year, prev_month)
     
-    prev_deposits = session.query(Deposit).filter(
+    all_deposits = session.query(Deposit).filter(
         Deposit.merchant == merchant,
-        Deposit.transaction_date.like(f"{prev_date_prefix}%")
-    ).all()
-    
-    all_deposits = list(prev_deposits) + list(deposits)
+        Deposit.transaction_date >= prev_start,
+        Deposit.transaction_date < month_end
+    ).order_by(Deposit.transaction_date).all()
+    deposits = [dep for dep in all_deposits if dep.transaction_date >= month_start]
     
+    fpx_settlement, ewallet_settlement = _build_settlement_map(all_deposits, holidays)
+    _apply_available_settlements(deposits, fpx_settlement, ewallet_settlement)
+
+
+@lru_cache(maxsize=1024)
+def _month_index(date_str: str) -> int:
+    return int(date_str[:4]) * 12 + int(date_str[5:7])
+
+
+def _build_settlement_map(deposits, holidays: Set[str]):
     fpx_settlement: Dict[str, float] = {}
     ewallet_settlement: Dict[str, float] = {}
     
-    for dep in all_deposits:
+    for dep in deposits:
         if dep.fpx_settlement_rule and dep.fpx_gross:
             settlement_date = calculate_settlement_date(
-                dep.transaction_date, dep.fpx_settlement_rule, public_holidays, add_on_holidays, exclude_holidays
+                dep.transaction_date, dep.fpx_settlement_rule, holidays
             )
-            if settlement_date and settlement_date.startswith(date_prefix):
-                fpx_settlement[settlement_date] = fpx_settlement.get(settlement_date, 0) + dep.fpx_gross
+            _add_settlement(fpx_settlement, dep.transaction_date, settlement_date, dep.fpx_gross)
         
         if dep.ewallet_settlement_rule and dep.ewallet_gross:
             settlement_date = calculate_settlement_date(
-                dep.transaction_date, dep.ewallet_settlement_rule, public_holidays, add_on_holidays, exclude_holidays
+                dep.transaction_date, dep.ewallet_settlement_rule, holidays
             )
-            if settlement_date and settlement_date.startswith(date_prefix):
-                ewallet_settlement[settlement_date] = ewallet_settlement.get(settlement_date, 0) + dep.ewallet_gross
+            _add_settlement(ewallet_settlement, dep.transaction_date, settlement_date, dep.ewallet_gross)
     
+    return fpx_settlement, ewallet_settlement
+
+
+def _add_settlement(settlement: Dict[str, float], tx_date: str, settlement_date: Optional[str], gross: Optional[float]):
+    """Count a deposit's gross on its settlement date if that falls in its own or the following month."""
+    if settlement_date and gross and 0 <= _month_index(settlement_date) - _month_index(tx_date) <= 1:
+        settlement[settlement_date] = settlement.get(settlement_date, 0) + gross
+
+
+def _available_settlements(transaction_date: str, fpx_settlement: Dict[str, float],
+                           ewallet_settlement: Dict[str, float]) -> tuple:
+    available_fpx = round_decimal(fpx_settlement.get(transaction_date, 0))
+    available_ewallet = round_decimal(ewallet_settlement.get(transaction_date, 0))
+    return available_fpx, available_ewallet, round_decimal(available_fpx + available_ewallet)
+
+
+def _apply_available_settlements(deposits, fpx_settlement: Dict[str, float], ewallet_settlement: Dict[str, float]):
     for deposit in deposits:
-        deposit.available_fpx = round_decimal(fpx_settlement.get(deposit.transaction_date, 0))
-        deposit.available_ewallet = round_decimal(ewallet_settlement.get(deposit.transaction_date, 0))
-        deposit.available_total = round_decimal((deposit.available_fpx or 0) + (deposit.available_ewallet or 0))
+        (
+            deposit.available_fpx,
+            deposit.available_ewallet,
+            deposit.available_total,
+        ) = _available_settlements(deposit.transaction_date, fpx_settlement, ewallet_settlement)
 
 
 class DepositSheetService:
@@ -212,7 +272,7 @@ class DepositSheetService:
     @classmethod
     def get_client(cls) -> SheetsClient:
         if cls._client is None:
-            cls._client = SheetsClient()
+            cls._client = get_sheets_client()
         return cls._client
     
     @classmethod
@@ -239,23 +299,24 @@ class DepositSheetService:
         
         try:
             params = ParameterService.load_parameters()
-            add_on_holidays = params['add_on_holidays']
-            exclude_holidays = params['exclude_holidays']
-            public_holidays = load_malaysia_holidays()
+            holidays = merge_holidays(
+                load_malaysia_holidays(), params['add_on_holidays'], params['exclude_holidays']
+            )
             
             manual_inputs = cls._read_manual_inputs()
-            cls._apply_manual_inputs(session, manual_inputs, public_holidays, add_on_holidays, exclude_holidays)
+            cls._apply_manual_inputs(session, manual_inputs, holidays)
             
-            _calculate_available_settlements(
-                session, merchant, year, month, public_holidays, add_on_holidays, exclude_holidays
-            )
+            with session.no_autoflush:
+                _calculate_available_settlements(session, merchant, year, month, holidays)
             
             session.commit()
+            SummarySheetService.clear_cache()
             
-            date_prefix = f"{year}-{month:02d}"
+            month_start, month_end = month_bounds(year, month)
             records = session.query(Deposit).filter(
                 Deposit.merchant == merchant,
-                Deposit.transaction_date.like(f"{date_prefix}%")
+                Deposit.transaction_date >= month_start,
+                Deposit.transaction_date < month_end
             ).order_by(Deposit.transaction_date).all()
             
             cls._write_to_sheet(records)
@@ -310,20 +371,16 @@ class DepositSheetService:
     
     @classmethod
     def _apply_manual_inputs(cls, session, manual_inputs: List[Dict],
-                             public_holidays: Set[str], add_on_holidays: Set[str],
-                             exclude_holidays: Set[str] = None) -> int:
+                             holidays: Set[str]) -> int:
         if not manual_inputs:
             return 0
         
-        ids = [m['id'] for m in manual_inputs]
-        records = session.query(Deposit).filter(Deposit.id.in_(ids)).all()
-        records_by_id = {rec.id: rec for rec in records}
+        manual_by_id = {m['id']: m for m in manual_inputs}
+        records = session.query(Deposit).filter(Deposit.id.in_(list(manual_by_id))).all()
         
         count = 0
-        for input_data in manual_inputs:
-            record = records_by_id.get(input_data['id'])
-            if not record:
-                continue
+        for record in records:
+            input_data = manual_by_id[record.id]
             
             if input_data['fpx_fee_type'] is not None:
                 record.fpx_fee_type = input_data['fpx_fee_type'].lower()
@@ -333,8 +390,7 @@ class DepositSheetService:
             if input_data['fpx_settlement_rule'] is not None:
                 record.fpx_settlement_rule = input_data['fpx_settlement_rule'].upper()
                 record.fpx_settlement_date = calculate_settlement_date(
-                    record.transaction_date, record.fpx_settlement_rule,
-                    public_holidays, add_on_holidays, exclude_holidays
+                    record.transaction_date, record.fpx_settlement_rule, holidays
                 )
             else:
                 record.fpx_settlement_rule = None
@@ -348,8 +404,7 @@ class DepositSheetService:
             if input_data['ewallet_settlement_rule'] is not None:
                 record.ewallet_settlement_rule = input_data['ewallet_settlement_rule'].upper()
                 record.ewallet_settlement_date = calculate_settlement_date(
-                    record.transaction_date, record.ewallet_settlement_rule,
-                    public_holidays, add_on_holidays, exclude_holidays
+                    record.transaction_date, record.ewallet_settlement_rule, holidays
                 )
             else:
                 record.ewallet_settlement_rule = None
@@ -409,7 +464,7 @@ class DepositSheetService:
                 rec.remarks or '',
             ])
         
-        worksheet = client.spreadsheet.worksheet(DEPOSIT_SHEET)
+        worksheet = client.worksheet(DEPOSIT_SHEET)
         client.clear_data_validation(DEPOSIT_SHEET, DATA_RANGE)
         worksheet.batch_clear([DATA_RANGE])
 
@@ -82,22 +82,27 @@ class FiuuAPIClient:
             return 0
         
         session = get_session()
-        inserted_count = 0
         
         try:
-            for tx in transactions:
-                stmt = insert(PGTransaction).values(
-                    transaction_id=tx['OrderID'],
-                    transaction_date=tx['BillingDate'],
-                    amount=float(tx['Amount']),
-                    platform='fiuu',
-                    channel=self._normalize_channel(tx.get('Channel', '')),
-                    account_label=self.label
-                ).on_conflict_do_nothing(
-                    index_elements=['transaction_id']
-                )
-                result = session.execute(stmt)
-                inserted_count += result.rowcount
+            channels = {
+                channel: self._normalize_channel(channel)
+                for channel in {tx.get('Channel', '') for tx in transactions}
+            }
+            stmt = insert(PGTransaction.__table__).on_conflict_do_nothing(
+                index_elements=['transaction_id']
+            )
+            result = session.execute(stmt, [
+                {
+                    'transaction_id': tx['OrderID'],
+                    'transaction_date': tx['BillingDate'],
+                    'amount': float(tx['Amount']),
+                    'platform': 'fiuu',
+                    'channel': channels[tx.get('Channel', '')],
+                    'account_label': self.label
+                }
+                for tx in transactions
+            ])
+            inserted_count = result.rowcount
             
             session.commit()
             logger.info(f"Saved {inserted_count} transactions: {self.label}")
@@ -2,7 +2,7 @@ from typing import List, Dict, Any, Optional
 
 from src.core.loader import load_settings
 from src.core.logger import get_logger
-from src.services.client import SheetsClient
+from src.services.client import SheetsClient, get_sheets_client
 
 logger = get_logger(__name__)
 
@@ -26,7 +26,7 @@ class JobSheetService:
     @classmethod
     def get_client(cls) -> SheetsClient:
         if cls._client is None:
-            cls._client = SheetsClient()
+            cls._client = get_sheets_client()
         return cls._client
 
     @classmethod
@@ -39,7 +39,7 @@ class JobSheetService:
         try:
             client = cls.get_client()
             jobs_sheet = cls.get_jobs_sheet_name()
-            worksheet = client.spreadsheet.worksheet(jobs_sheet)
+            worksheet = client.worksheet(jobs_sheet)
             worksheet.batch_clear([DATA_RANGE])
             cls.reset_cache()
             logger.debug("Cleared Jobs sheet")
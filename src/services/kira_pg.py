@@ -1,21 +1,25 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set
+from itertools import groupby
+from operator import itemgetter
 import re
 
-from sqlalchemy import func
+from sqlalchemy import func, or_
+from sqlalchemy.dialects.sqlite import insert
 
 from src.core.database import get_session
 from src.core.models import KiraPG, KiraTransaction, PGTransaction
 from src.core.logger import get_logger
-from src.services.client import SheetsClient
+from src.services.client import SheetsClient, get_sheets_client
 from src.services.parameters import ParameterService
-from src.utils.helpers import categorize_channel, round_decimal, to_float, safe_get_value, parse_period, MONTHS
-from src.utils.holiday import load_malaysia_holidays, calculate_settlement_date
+from src.utils.helpers import categorize_channel_expr, round_decimal, to_float, safe_get_value, parse_period, month_bounds, MONTHS
+from src.utils.holiday import load_malaysia_holidays, merge_holidays, calculate_settlement_date
 
 logger = get_logger(__name__)
 
 KIRA_PG_SHEET = 'Kira PG'
 DATA_START_ROW = 4
 DATA_RANGE = 'A4:R300'
+AGGREGATE_YIELD_PER = 1000
 
 
 
@@ -23,10 +27,11 @@ def init_kira_pg():
     session = get_session()
     
     try:
+        kira_channel = categorize_channel_expr(KiraTransaction.payment_method)
         kira_agg = session.query(
             PGTransaction.account_label.label('pg_account_label'),
             func.substr(KiraTransaction.transaction_date, 1, 10).label('tx_date'),
-            KiraTransaction.payment_method,
+            kira_channel.label('channel'),
             func.sum(KiraTransaction.amount).label('kira_amount'),
             func.sum(KiraTransaction.mdr).label('mdr'),
             func.sum(KiraTransaction.settlement_amount).label('kira_settlement_amount'),
@@ -36,13 +41,23 @@ def init_kira_pg():
         ).group_by(
             PGTransaction.account_label,
             func.substr(KiraTransaction.transaction_date, 1, 10),
-            KiraTransaction.payment_method
-        ).all()
+            kira_channel
+        ).yield_per(AGGREGATE_YIELD_PER)
         
+        kira_map: Dict[tuple, Dict] = {
+            (row.pg_account_label, row.tx_date, row.channel): {
+                'kira_amount': row.kira_amount or 0,
+                'mdr': row.mdr or 0,
+                'kira_settlement_amount': row.kira_settlement_amount or 0,
+            }
+            for row in kira_agg
+        }
+        
+        pg_channel = categorize_channel_expr(PGTransaction.channel)
         pg_agg = session.query(
             PGTransaction.account_label.label('pg_account_label'),
             func.substr(PGTransaction.transaction_date, 1, 10).label('tx_date'),
-            PGTransaction.channel,
+            pg_channel.label('channel'),
             func.sum(PGTransaction.amount).label('pg_amount'),
             func.count().label('volume'),
         ).join(
@@ -51,31 +66,29 @@ def init_kira_pg():
         ).group_by(
             PGTransaction.account_label,
             func.substr(PGTransaction.transaction_date, 1, 10),
-            PGTransaction.channel
-        ).all()
-        
-        kira_map: Dict[tuple, Dict] = {}
-        for row in kira_agg:
-            channel = categorize_channel(row.payment_method)
-            key = (row.pg_account_label, row.tx_date, channel)
-            if key not in kira_map:
-                kira_map[key] = {'kira_amount': 0, 'mdr': 0, 'kira_settlement_amount': 0}
-            kira_map[key]['kira_amount'] += row.kira_amount or 0
-            kira_map[key]['mdr'] += row.mdr or 0
-            kira_map[key]['kira_settlement_amount'] += row.kira_settlement_amount or 0
+            pg_channel
+        ).yield_per(AGGREGATE_YIELD_PER)
         
-        pg_map: Dict[tuple, Dict] = {}
-        for row in pg_agg:
-            channel = categorize_channel(row.channel)
-            key = (row.pg_account_label, row.tx_date, channel)
-            if key not in pg_map:
-                pg_map[key] = {'pg_amount': 0, 'volume': 0}
-            pg_map[key]['pg_amount'] += row.pg_amount or 0
-            pg_map[key]['volume'] += row.volume or 0
+        pg_map: Dict[tuple, Dict] = {
+            (row.pg_account_label, row.tx_date, row.channel): {
+                'pg_amount': row.pg_amount or 0,
+                'volume': row.volume or 0,
+            }
+            for row in pg_agg
+        }
         
-        all_keys = set(kira_map.keys()) | set(pg_map.keys())
+        all_keys = kira_map.keys() | pg_map.keys()
         
-        existing = session.query(KiraPG).all()
+        existing = session.query(
+            KiraPG.pg_account_label,
+            KiraPG.transaction_date,
+            KiraPG.channel,
+            KiraPG.settlement_rule,
+            KiraPG.settlement_date,
+            KiraPG.fee_type,
+            KiraPG.fee_rate,
+            KiraPG.remarks,
+        ).yield_per(AGGREGATE_YIELD_PER)
         existing_map = {(e.pg_account_label, e.transaction_date, e.channel): e for e in existing}
         
         records = []
@@ -100,7 +113,6 @@ def init_kira_pg():
             daily_variance = round_decimal(kira_data['kira_amount'] - pg_data['pg_amount'])
             
             records.append({
-                'key': key,
                 'pg_account_label': pg_account_label,
                 'transaction_date': tx_date,
                 'channel': channel,
@@ -119,22 +131,25 @@ def init_kira_pg():
                 'remarks': remarks,
             })
         
-        records.sort(key=lambda x: (x['transaction_date'], x['pg_account_label'] or '', x['channel']))
+        records.sort(key=itemgetter('transaction_date', 'pg_account_label', 'channel'))
         
         cumulative = 0
         for record in records:
             cumulative += record['daily_variance'] or 0
             record['cumulative_variance'] = round_decimal(cumulative)
         
-        for record in records:
-            key = record.pop('key')
-            existing_record = existing_map.get(key)
-            
-            if existing_record:
-                for attr, value in record.items():
-                    setattr(existing_record, attr, value)
-            else:
-                session.add(KiraPG(**record))
+        if records:
+            value_columns = [col for col in records[0] if col not in ('pg_account_label', 'transaction_date', 'channel')]
+            stmt = insert(KiraPG)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['pg_account_label', 'transaction_date', 'channel'],
+                set_={col: stmt.excluded[col] for col in value_columns + ['updated_at']},
+                where=or_(*(
+                    getattr(KiraPG, col).is_distinct_from(stmt.excluded[col])
+                    for col in value_columns
+                ))
+            )
+            session.execute(stmt, records)
         
         session.commit()
         logger.info(f"Initialized {len(records)} kira_pg records")
@@ -155,19 +170,20 @@ def _calculate_fee(fee_type: Optional[str], fee_rate: Optional[float], amount: O
     return round_decimal(amount * fee_rate / 100) if amount else None
 
 
-def _recalculate_cumulative_variance(session, year_month: str):
+def _recalculate_cumulative_variance(session, year_months: Set[str]):
     records = session.query(KiraPG).filter(
-        KiraPG.transaction_date.like(f"{year_month}%")
+        func.substr(KiraPG.transaction_date, 1, 7).in_(year_months)
     ).order_by(
         KiraPG.transaction_date,
         KiraPG.pg_account_label,
         KiraPG.channel
     ).all()
     
-    cumulative = 0
-    for record in records:
-        cumulative += record.daily_variance or 0
-        record.cumulative_variance = round_decimal(cumulative)
+    for _, month_records in groupby(records, key=lambda r: r.transaction_date[:7]):
+        cumulative = 0
+        for record in month_records:
+            cumulative += record.daily_variance or 0
+            record.cumulative_variance = round_decimal(cumulative)
 
 
 class KiraPGSheetService:
@@ -176,7 +192,7 @@ class KiraPGSheetService:
     @classmethod
     def get_client(cls) -> SheetsClient:
         if cls._client is None:
-            cls._client = SheetsClient()
+            cls._client = get_sheets_client()
         return cls._client
     
     @classmethod
@@ -195,18 +211,19 @@ class KiraPGSheetService:
         
         try:
             params = ParameterService.load_parameters()
-            add_on_holidays = params['add_on_holidays']
-            exclude_holidays = params['exclude_holidays']
-            public_holidays = load_malaysia_holidays()
+            holidays = merge_holidays(
+                load_malaysia_holidays(), params['add_on_holidays'], params['exclude_holidays']
+            )
             
             manual_inputs = cls._read_manual_inputs()
-            cls._apply_manual_inputs(session, manual_inputs, public_holidays, add_on_holidays, exclude_holidays)
+            cls._apply_manual_inputs(session, manual_inputs, holidays)
             
             session.commit()
             
-            date_prefix = f"{year}-{month:02d}"
+            month_start, month_end = month_bounds(year, month)
             records = session.query(KiraPG).filter(
-                KiraPG.transaction_date.like(f"{date_prefix}%")
+                KiraPG.transaction_date >= month_start,
+                KiraPG.transaction_date < month_end
             ).order_by(
                 KiraPG.transaction_date,
                 KiraPG.pg_account_label,
@@ -257,27 +274,23 @@ class KiraPGSheetService:
     
     @classmethod
     def _apply_manual_inputs(cls, session, manual_inputs: List[Dict],
-                             public_holidays, add_on_holidays, exclude_holidays=None) -> int:
+                             holidays: Set[str]) -> int:
         if not manual_inputs:
             return 0
         
-        ids = [m['id'] for m in manual_inputs]
-        records = session.query(KiraPG).filter(KiraPG.id.in_(ids)).all()
-        records_by_id = {rec.id: rec for rec in records}
+        manual_by_id = {m['id']: m for m in manual_inputs}
+        records = session.query(KiraPG).filter(KiraPG.id.in_(list(manual_by_id))).all()
         
         affected_dates = set()
         count = 0
         
-        for input_data in manual_inputs:
-            record = records_by_id.get(input_data['id'])
-            if not record:
-                continue
+        for record in records:
+            input_data = manual_by_id[record.id]
             
             if input_data['settlement_rule'] is not None:
                 record.settlement_rule = input_data['settlement_rule'].upper()
                 record.settlement_date = calculate_settlement_date(
-                    record.transaction_date, record.settlement_rule,
-                    public_holidays, add_on_holidays, exclude_holidays
+                    record.transaction_date, record.settlement_rule, holidays
                 )
             else:
                 record.settlement_rule = None
@@ -298,8 +311,9 @@ class KiraPGSheetService:
             affected_dates.add(record.transaction_date[:7])
             count += 1
         
-        for ym in affected_dates:
-            _recalculate_cumulative_variance(session, ym)
+        if affected_dates:
+            with session.no_autoflush:
+                _recalculate_cumulative_variance(session, affected_dates)
         
         logger.info(f"Applied {count} manual inputs to Kira PG")
         return count
@@ -331,7 +345,7 @@ class KiraPGSheetService:
                 rec.remarks or '',
             ])
         
-        worksheet = client.spreadsheet.worksheet(KIRA_PG_SHEET)
+        worksheet = client.worksheet(KIRA_PG_SHEET)
         client.clear_data_validation(KIRA_PG_SHEET, DATA_RANGE)
         worksheet.batch_clear([DATA_RANGE])
 
@@ -1,10 +1,14 @@
-from typing import Dict, Any, List, Optional
+import threading
+import time
+from copy import deepcopy
+from operator import itemgetter
+from typing import Dict, Any, List, Optional, Tuple
 from sqlalchemy import func
 
 from src.core.database import get_session
 from src.core.models import MerchantLedger, AgentLedger, Deposit
 from src.core.logger import get_logger
-from src.services.client import SheetsClient
+from src.services.client import SheetsClient, get_sheets_client
 from src.utils.helpers import MONTHS, round_decimal, to_float
 
 logger = get_logger(__name__)
@@ -13,6 +17,14 @@ SUMMARY_SHEET = 'Summary'
 DATA_START_ROW = 5
 DATA_RANGE = 'A5:N200'
 
+SUMMARY_YIELD_PER = 500
+CACHE_TTL_SECONDS = 300
+CACHE_MAX_SIZE = 64
+
+MONTH_KEYS = tuple(str(m) for m in range(1, 13))
+_merchant_row = itemgetter(*MONTH_KEYS, 'total')
+_totals_row = itemgetter(*MONTH_KEYS, 'grand_total')
+
 VIEW_TYPE_MAP = {
     'Merchants': 'merchants',
     'Agents': 'agents',
@@ -22,11 +34,14 @@ VIEW_TYPE_MAP = {
 
 class SummarySheetService:
     _client: Optional[SheetsClient] = None
+    _cache: Dict[Tuple[int, str], Tuple[float, Dict[str, Any]]] = {}
+    _cache_generation = 0
+    _cache_lock = threading.Lock()
     
     @classmethod
     def get_client(cls) -> SheetsClient:
         if cls._client is None:
-            cls._client = SheetsClient()
+            cls._client = get_sheets_client()
         return cls._client
     
     @classmethod
@@ -48,6 +63,26 @@ class SummarySheetService:
         year = int(year_str)
         view_type = VIEW_TYPE_MAP.get(view_type_raw, view_type_raw.lower())
         
+        try:
+            data = cls.get_summary(year, view_type)
+            cls._write_to_sheet(data)
+            
+            return len(data.get('merchants', []))
+            
+        except Exception as e:
+            logger.error(f"Failed to sync Summary sheet: {e}")
+            raise
+    
+    @classmethod
+    def get_summary(cls, year: int, view_type: str) -> Dict[str, Any]:
+        key = (year, view_type)
+        
+        with cls._cache_lock:
+            cached = cls._cache.get(key)
+            if cached and time.monotonic() - cached[0] < CACHE_TTL_SECONDS:
+                return deepcopy(cached[1])
+            generation = cls._cache_generation
+        
         session = get_session()
         
         try:
@@ -58,55 +93,55 @@ class SummarySheetService:
             elif view_type == 'payout_pool':
                 data = cls._get_payout_pool_summary(session, year)
             else:
-                data = {'merchants': [], 'data': {}, 'monthly_totals': {}}
-            
-            cls._write_to_sheet(data)
-            
-            return len(data.get('merchants', []))
-            
-        except Exception as e:
-            logger.error(f"Failed to sync Summary sheet: {e}")
-            raise
+                data = cls._format_results([])
         finally:
             session.close()
+        
+        with cls._cache_lock:
+            if generation == cls._cache_generation:
+                if key not in cls._cache and len(cls._cache) >= CACHE_MAX_SIZE:
+                    cls._cache.pop(next(iter(cls._cache)))
+                cls._cache[key] = (time.monotonic(), deepcopy(data))
+        
+        return data
+    
+    @classmethod
+    def clear_cache(cls):
+        with cls._cache_lock:
+            cls._cache.clear()
+            cls._cache_generation += 1
     
     @classmethod
     def _get_merchants_summary(cls, session, year: int) -> Dict[str, Any]:
-        date_prefix = f"{year}-"
-        
-        results = session.query(
-            Deposit.merchant,
-            func.substr(Deposit.transaction_date, 6, 2).label('month'),
-            func.sum(
-                func.coalesce(Deposit.fpx_amount, 0) +
-                func.coalesce(Deposit.ewallet_amount, 0)
-            ).label('total')
-        ).filter(
-            Deposit.transaction_date.like(f"{date_prefix}%")
-        ).group_by(
-            Deposit.merchant,
-            func.substr(Deposit.transaction_date, 6, 2)
-        ).all()
-        
-        return cls._format_results(results)
+        return cls._get_monthly_sum_summary(
+            session, year, Deposit, Deposit.fpx_amount, Deposit.ewallet_amount
+        )
     
     @classmethod
     def _get_agents_summary(cls, session, year: int) -> Dict[str, Any]:
-        date_prefix = f"{year}-"
+        return cls._get_monthly_sum_summary(
+            session, year, AgentLedger, AgentLedger.available_total, AgentLedger.commission_amount
+        )
+    
+    @classmethod
+    def _get_monthly_sum_summary(cls, session, year: int, model, first_amount, second_amount) -> Dict[str, Any]:
+        year_start, year_end = f"{year}-01-01", f"{year + 1}-01-01"
+        month = func.substr(model.transaction_date, 6, 2)
         
         results = session.query(
-            AgentLedger.merchant,
-            func.substr(AgentLedger.transaction_date, 6, 2).label('month'),
+            model.merchant,
+            month.label('month'),
             func.sum(
-                func.coalesce(AgentLedger.available_total, 0) +
-                func.coalesce(AgentLedger.commission_amount, 0)
+                func.coalesce(first_amount, 0) +
+                func.coalesce(second_amount, 0)
             ).label('total')
         ).filter(
-            AgentLedger.transaction_date.like(f"{date_prefix}%")
+            model.transaction_date >= year_start,
+            model.transaction_date < year_end
         ).group_by(
-            AgentLedger.merchant,
-            func.substr(AgentLedger.transaction_date, 6, 2)
-        ).all()
+            model.merchant,
+            month
+        ).yield_per(SUMMARY_YIELD_PER)
         
         return cls._format_results(results)
     
@@ -114,14 +149,15 @@ class SummarySheetService:
     def _get_payout_pool_summary(cls, session, year: int) -> Dict[str, Any]:
         from sqlalchemy.orm import aliased
         
-        date_prefix = f"{year}-"
+        year_start, year_end = f"{year}-01-01", f"{year + 1}-01-01"
         
         last_date_subquery = session.query(
             MerchantLedger.merchant.label('merchant'),
             func.substr(MerchantLedger.transaction_date, 6, 2).label('month'),
             func.max(MerchantLedger.transaction_date).label('last_date')
         ).filter(
-            MerchantLedger.transaction_date.like(f"{date_prefix}%")
+            MerchantLedger.transaction_date >= year_start,
+            MerchantLedger.transaction_date < year_end
         ).group_by(
             MerchantLedger.merchant,
             func.substr(MerchantLedger.transaction_date, 6, 2)
@@ -132,18 +168,18 @@ class SummarySheetService:
             last_date_subquery.c.month.label('month'),
             MerchantLedger.payout_pool_balance.label('total')
         ).filter(
-            MerchantLedger.transaction_date.like(f"{date_prefix}%")
+            MerchantLedger.transaction_date >= year_start,
+            MerchantLedger.transaction_date < year_end
         ).join(
             last_date_subquery,
             (MerchantLedger.merchant == last_date_subquery.c.merchant) &
             (MerchantLedger.transaction_date == last_date_subquery.c.last_date)
-        ).all()
+        ).yield_per(SUMMARY_YIELD_PER)
         
         return cls._format_results(results)
     
     @classmethod
     def _format_results(cls, results) -> Dict[str, Any]:
-        merchants = set()
         data = {}
         monthly_totals = {str(m): 0 for m in range(1, 13)}
         monthly_totals['grand_total'] = 0
@@ -153,20 +189,23 @@ class SummarySheetService:
             month = str(int(row.month))
             total = to_float(row.total) or 0
             
-            merchants.add(merchant)
-            
-            if merchant not in data:
-                data[merchant] = {str(m): 0 for m in range(1, 13)}
-                data[merchant]['total'] = 0
+            merchant_data = data.get(merchant)
+            if merchant_data is None:
+                merchant_data = data[merchant] = {str(m): 0 for m in range(1, 13)}
+                merchant_data['total'] = 0
             
-            data[merchant][month] = round_decimal(total)
-            data[merchant]['total'] = round_decimal(data[merchant]['total'] + total)
+            merchant_data[month] = total
+            merchant_data['total'] += total
             
-            monthly_totals[month] = round_decimal(monthly_totals[month] + total)
-            monthly_totals['grand_total'] = round_decimal(monthly_totals['grand_total'] + total)
+            monthly_totals[month] += total
+            monthly_totals['grand_total'] += total
+        
+        for totals in (*data.values(), monthly_totals):
+            for key, value in totals.items():
+                totals[key] = round_decimal(value)
         
         return {
-            'merchants': sorted(list(merchants)),
+            'merchants': sorted(data),
             'data': data,
             'monthly_totals': monthly_totals
         }
@@ -179,45 +218,10 @@ class SummarySheetService:
         merchant_data = data.get('data', {})
         monthly_totals = data.get('monthly_totals', {})
         
-        rows = []
-        for merchant in merchants:
-            m_data = merchant_data.get(merchant, {})
-            rows.append([
-                merchant,
-                m_data.get('1', 0),
-                m_data.get('2', 0),
-                m_data.get('3', 0),
-                m_data.get('4', 0),
-                m_data.get('5', 0),
-                m_data.get('6', 0),
-                m_data.get('7', 0),
-                m_data.get('8', 0),
-                m_data.get('9', 0),
-                m_data.get('10', 0),
-                m_data.get('11', 0),
-                m_data.get('12', 0),
-                m_data.get('total', 0),
-            ])
-        
-        grand_total = monthly_totals.get('grand_total', 0)
-        rows.append([
-            'Total Deposit',
-            monthly_totals.get('1', 0),
-            monthly_totals.get('2', 0),
-            monthly_totals.get('3', 0),
-            monthly_totals.get('4', 0),
-            monthly_totals.get('5', 0),
-            monthly_totals.get('6', 0),
-            monthly_totals.get('7', 0),
-            monthly_totals.get('8', 0),
-            monthly_totals.get('9', 0),
-            monthly_totals.get('10', 0),
-            monthly_totals.get('11', 0),
-            monthly_totals.get('12', 0),
-            grand_total,
-        ])
-        
-        worksheet = client.spreadsheet.worksheet(SUMMARY_SHEET)
+        rows = [[merchant, *_merchant_row(merchant_data[merchant])] for merchant in merchants]
+        rows.append(['Total Deposit', *_totals_row(monthly_totals)])
+        
+        worksheet = client.worksheet(SUMMARY_SHEET)
         client.clear_row_backgrounds(SUMMARY_SHEET, DATA_START_ROW, 200, 1, 14)
         worksheet.batch_clear([DATA_RANGE])
 
@@ -1,14 +1,15 @@
-from typing import Dict, List, Any, Optional
-from calendar import monthrange
+from typing import Dict, List, Any, Optional, Set, Tuple
+from operator import attrgetter, itemgetter
 import re
 
-from sqlalchemy import and_
+from sqlalchemy import and_, case, update
 
 from src.core.database import get_session
 from src.core.models import MerchantLedger, Deposit
 from src.core.logger import get_logger
-from src.services.client import SheetsClient
-from src.utils.helpers import round_decimal, to_float, safe_get_value, parse_period, MONTHS
+from src.services.client import SheetsClient, get_sheets_client
+from src.services.ledger_summary import SummarySheetService
+from src.utils.helpers import round_decimal, to_float, safe_get_value, parse_period, month_bounds, missing_month_dates, missing_days_insert, insert_missing_days, MONTHS
 
 logger = get_logger(__name__)
 
@@ -16,30 +17,84 @@ MERCHANT_LEDGER_SHEET = 'Merchants Balance & Settlement Ledger'
 DATA_START_ROW = 5
 DATA_RANGE = 'A5:X50'
 
-
-
-def init_merchant_ledger(merchant: str, year: int, month: int):
+SHEET_COLUMNS = (
+    ('id', ''),
+    ('transaction_date', ''),
+    ('fpx_amount', 0),
+    ('fpx_fee', 0),
+    ('fpx_gross', 0),
+    ('ewallet_amount', 0),
+    ('ewallet_fee', 0),
+    ('ewallet_gross', 0),
+    ('total_gross', 0),
+    ('total_fee', 0),
+    ('available_fpx', 0),
+    ('available_ewallet', 0),
+    ('available_total', 0),
+    ('settlement_fund', ''),
+    ('settlement_charges', ''),
+    ('withdrawal_amount', ''),
+    ('withdrawal_rate', ''),
+    ('withdrawal_charges', ''),
+    ('topup_payout_pool', ''),
+    ('payout_pool_balance', ''),
+    ('available_balance', ''),
+    ('total_balance', ''),
+    ('updated_at', ''),
+    ('remarks', ''),
+)
+SHEET_DEFAULTS = tuple(default for _, default in SHEET_COLUMNS)
+_sheet_row = itemgetter(*(column for column, _ in SHEET_COLUMNS))
+
+MANUAL_INPUT_FIELDS = (
+    'settlement_fund',
+    'settlement_charges',
+    'withdrawal_amount',
+    'withdrawal_rate',
+    'topup_payout_pool',
+    'remarks',
+)
+
+BALANCE_COLUMNS = (
+    'available_fpx',
+    'available_ewallet',
+    'available_total',
+    'payout_pool_balance',
+    'available_balance',
+    'total_balance',
+)
+_balance_row = attrgetter(*BALANCE_COLUMNS)
+
+
+def init_merchant_ledgers(periods: List[Tuple[str, int, int]]):
     session = get_session()
     
     try:
-        date_prefix = f"{year}-{month:02d}"
-        _, last_day = monthrange(year, month)
-        
-        existing = session.query(MerchantLedger.transaction_date).filter(
-            and_(
-                MerchantLedger.merchant == merchant,
-                MerchantLedger.transaction_date.like(f"{date_prefix}%")
-            )
+        existing = session.query(MerchantLedger.merchant, MerchantLedger.transaction_date).filter(
+            MerchantLedger.merchant.in_({merchant for merchant, _, _ in periods})
         ).all()
+        existing_dates: Dict[str, Set[str]] = {}
+        for rec in existing:
+            existing_dates.setdefault(rec.merchant, set()).add(rec.transaction_date)
         
-        existing_dates = {rec[0] for rec in existing}
-        
-        for day in range(1, last_day + 1):
-            date_str = f"{year}-{month:02d}-{day:02d}"
-            if date_str not in existing_dates:
-                session.add(MerchantLedger(merchant=merchant, transaction_date=date_str))
+        missing = []
+        for merchant, year, month in periods:
+            merchant_dates = existing_dates.setdefault(merchant, set())
+            try:
+                missing_dates = missing_month_dates(merchant_dates, year, month)
+            except Exception as e:
+                logger.error(f"Failed to init merchant ledger for {merchant} {year}-{month}: {e}")
+                continue
+            merchant_dates.update(missing_dates)
+            missing.extend(
+                {'merchant': merchant, 'transaction_date': date_str}
+                for date_str in missing_dates
+            )
         
+        if missing:
+            session.execute(missing_days_insert(MerchantLedger, 'merchant'), missing)
         session.commit()
+        SummarySheetService.clear_cache()
         
     except Exception as e:
         session.rollback()
@@ -56,12 +111,16 @@ def _get_previous_month_balance(session, merchant: str, year: int, month: int) -
         prev_month = 12
         prev_year = year - 1
 
-    prev_date_prefix = f"{prev_year}-{prev_month:02d}"
+    prev_start, prev_end = month_bounds(prev_year, prev_month)
 
-    last_record = session.query(MerchantLedger).filter(
+    last_record = session.query(
+        MerchantLedger.payout_pool_balance,
+        MerchantLedger.available_balance
+    ).filter(
         and_(
             MerchantLedger.merchant == merchant,
-            MerchantLedger.transaction_date.like(f"{prev_date_prefix}%")
+            MerchantLedger.transaction_date >= prev_start,
+            MerchantLedger.transaction_date < prev_end
         )
     ).order_by(MerchantLedger.transaction_date.desc()).first()
 
@@ -74,38 +133,53 @@ def _get_previous_month_balance(session, merchant: str, year: int, month: int) -
 
 
 def _recalculate_balances(session, merchant: str, year: int, month: int):
-    date_prefix = f"{year}-{month:02d}"
+    month_start, month_end = month_bounds(year, month)
 
     prev_payout, prev_available = _get_previous_month_balance(session, merchant, year, month)
 
-    deposits = session.query(Deposit).filter(
+    deposits = session.query(
+        Deposit.transaction_date,
+        Deposit.available_fpx,
+        Deposit.available_ewallet,
+        Deposit.available_total,
+    ).filter(
         and_(
             Deposit.merchant == merchant,
-            Deposit.transaction_date.like(f"{date_prefix}%")
+            Deposit.transaction_date >= month_start,
+            Deposit.transaction_date < month_end
         )
     ).all()
     deposit_map = {d.transaction_date: d for d in deposits}
 
-    rows = session.query(MerchantLedger).filter(
+    rows = session.query(
+        MerchantLedger.id,
+        MerchantLedger.transaction_date,
+        MerchantLedger.settlement_fund,
+        MerchantLedger.settlement_charges,
+        MerchantLedger.withdrawal_amount,
+        MerchantLedger.withdrawal_charges,
+        MerchantLedger.topup_payout_pool,
+        *(getattr(MerchantLedger, column) for column in BALANCE_COLUMNS),
+    ).filter(
         and_(
             MerchantLedger.merchant == merchant,
-            MerchantLedger.transaction_date.like(f"{date_prefix}%")
+            MerchantLedger.transaction_date >= month_start,
+            MerchantLedger.transaction_date < month_end
         )
     ).order_by(MerchantLedger.transaction_date).all()
 
+    mappings = []
     for row in rows:
         deposit = deposit_map.get(row.transaction_date)
         
         if deposit:
-            row.available_fpx = deposit.available_fpx
-            row.available_ewallet = deposit.available_ewallet
-            row.available_total = deposit.available_total
+            available_fpx = deposit.available_fpx
+            available_ewallet = deposit.available_ewallet
+            available_total = deposit.available_total
         else:
-            row.available_fpx = None
-            row.available_ewallet = None
-            row.available_total = None
-        
-        available_total = row.available_total or 0
+            available_fpx = None
+            available_ewallet = None
+            available_total = None
 
         has_payout_activity = (
             row.withdrawal_amount is not None
@@ -114,39 +188,51 @@ def _recalculate_balances(session, merchant: str, year: int, month: int):
         )
 
         if has_payout_activity:
-            row.payout_pool_balance = round_decimal(
+            payout_pool_balance = round_decimal(
                 prev_payout
                 - (row.withdrawal_amount or 0)
                 - (row.withdrawal_charges or 0)
                 + (row.topup_payout_pool or 0)
             )
-            prev_payout = row.payout_pool_balance
+            prev_payout = payout_pool_balance
         else:
-            row.payout_pool_balance = None
+            payout_pool_balance = None
 
         has_available_activity = (
             row.settlement_fund is not None
-            or available_total > 0
+            or (available_total or 0) > 0
             or prev_available != 0
         )
 
         if has_available_activity:
-            row.available_balance = round_decimal(
+            available_balance = round_decimal(
                 prev_available
-                + available_total
+                + (available_total or 0)
                 - (row.settlement_fund or 0)
                 - (row.settlement_charges or 0)
             )
-            prev_available = row.available_balance
+            prev_available = available_balance
         else:
-            row.available_balance = None
+            available_balance = None
 
-        if row.payout_pool_balance is not None or row.available_balance is not None:
-            row.total_balance = round_decimal(
-                (row.payout_pool_balance or 0) + (row.available_balance or 0)
-            )
+        if payout_pool_balance is not None or available_balance is not None:
+            total_balance = round_decimal((payout_pool_balance or 0) + (available_balance or 0))
         else:
-            row.total_balance = None
+            total_balance = None
+
+        balances = (
+            available_fpx,
+            available_ewallet,
+            available_total,
+            payout_pool_balance,
+            available_balance,
+            total_balance,
+        )
+        if balances != _balance_row(row):
+            mappings.append({'id': row.id, **dict(zip(BALANCE_COLUMNS, balances))})
+
+    if mappings:
+        session.bulk_update_mappings(MerchantLedger, mappings)
 
 
 def list_merchants() -> List[str]:
@@ -169,17 +255,11 @@ def list_periods() -> List[str]:
             func.substr(KiraTransaction.transaction_date, 1, 7).label('ym')
         ).distinct().all()
         
-        periods = []
-        for rec in results:
-            if rec.ym:
-                year = rec.ym[:4]
-                month_num = int(rec.ym[5:7])
-                month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                              'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-                periods.append(f"{month_names[month_num-1]} {year}")
-        
-        periods.sort(key=lambda x: (x.split()[1], MONTHS[x.split()[0]]))
-        return periods
+        month_names = list(MONTHS)
+        return [
+            f"{month_names[int(ym[5:7]) - 1]} {ym[:4]}"
+            for ym in sorted(rec.ym for rec in results if rec.ym)
+        ]
     finally:
         session.close()
 
@@ -190,7 +270,7 @@ class MerchantLedgerSheetService:
     @classmethod
     def get_client(cls) -> SheetsClient:
         if cls._client is None:
-            cls._client = SheetsClient()
+            cls._client = get_sheets_client()
         return cls._client
     
     @classmethod
@@ -213,16 +293,17 @@ class MerchantLedgerSheetService:
         if not year or not month:
             raise ValueError("Invalid period format")
         
-        init_merchant_ledger(merchant, year, month)
-        
         session = get_session()
         
         try:
             manual_inputs = cls._read_manual_inputs()
+            
+            insert_missing_days(session, MerchantLedger, 'merchant', merchant, year, month)
             cls._apply_manual_inputs(session, manual_inputs)
             
             _recalculate_balances(session, merchant, year, month)
             session.commit()
+            SummarySheetService.clear_cache()
             
             data = cls._get_ledger_data(session, merchant, year, month)
             cls._write_to_sheet(data)
@@ -274,104 +355,115 @@ class MerchantLedgerSheetService:
         if not manual_inputs:
             return 0
         
-        ids = [m['id'] for m in manual_inputs]
-        records = session.query(MerchantLedger).filter(MerchantLedger.id.in_(ids)).all()
-        records_by_id = {rec.id: rec for rec in records}
-        
-        count = 0
+        values_by_id = {}
         for input_data in manual_inputs:
-            record = records_by_id.get(input_data['id'])
-            if not record:
-                continue
+            withdrawal_amount = input_data['withdrawal_amount']
+            withdrawal_rate = input_data['withdrawal_rate']
             
-            record.settlement_fund = input_data['settlement_fund']
-            record.settlement_charges = input_data['settlement_charges']
-            record.withdrawal_amount = input_data['withdrawal_amount']
-            record.withdrawal_rate = input_data['withdrawal_rate']
-            
-            if record.withdrawal_amount and record.withdrawal_rate:
-                record.withdrawal_charges = round_decimal(record.withdrawal_amount * record.withdrawal_rate / 100)
+            if withdrawal_amount and withdrawal_rate:
+                withdrawal_charges = round_decimal(withdrawal_amount * withdrawal_rate / 100)
             else:
-                record.withdrawal_charges = None
-            
-            record.topup_payout_pool = input_data['topup_payout_pool']
-            record.remarks = input_data['remarks']
+                withdrawal_charges = None
             
-            count += 1
+            values_by_id[input_data['id']] = {
+                **{field: input_data[field] for field in MANUAL_INPUT_FIELDS},
+                'withdrawal_charges': withdrawal_charges,
+            }
+        
+        columns = MANUAL_INPUT_FIELDS + ('withdrawal_charges',)
+        current = session.query(
+            MerchantLedger.id,
+            *(getattr(MerchantLedger, column) for column in columns)
+        ).filter(MerchantLedger.id.in_(list(values_by_id))).all()
+        changed = {
+            row.id: values_by_id[row.id]
+            for row in current
+            if tuple(values_by_id[row.id][column] for column in columns) != tuple(row[1:])
+        }
+        
+        count = 0
+        if changed:
+            result = session.execute(
+                update(MerchantLedger)
+                .where(MerchantLedger.id.in_(list(changed)))
+                .values({
+                    column: case(
+                        {record_id: values[column] for record_id, values in changed.items()},
+                        value=MerchantLedger.id
+                    )
+                    for column in columns
+                })
+                .execution_options(synchronize_session=False)
+            )
+            count = result.rowcount
         
         logger.info(f"Applied {count} manual inputs to Merchant Ledger")
         return count
     
     @classmethod
     def _get_ledger_data(cls, session, merchant: str, year: int, month: int) -> List[Dict]:
-        date_prefix = f"{year}-{month:02d}"
+        month_start, month_end = month_bounds(year, month)
         
-        deposits = session.query(Deposit).filter(
+        rows = session.query(
+            MerchantLedger.id,
+            MerchantLedger.transaction_date,
+            MerchantLedger.available_fpx.label('ledger_available_fpx'),
+            MerchantLedger.available_ewallet.label('ledger_available_ewallet'),
+            MerchantLedger.available_total.label('ledger_available_total'),
+            MerchantLedger.settlement_fund,
+            MerchantLedger.settlement_charges,
+            MerchantLedger.withdrawal_amount,
+            MerchantLedger.withdrawal_rate,
+            MerchantLedger.withdrawal_charges,
+            MerchantLedger.topup_payout_pool,
+            MerchantLedger.payout_pool_balance,
+            MerchantLedger.available_balance,
+            MerchantLedger.total_balance,
+            MerchantLedger.remarks,
+            MerchantLedger.updated_at,
+            Deposit.id.label('deposit_id'),
+            Deposit.fpx_amount,
+            Deposit.fpx_fee_amount,
+            Deposit.ewallet_amount,
+            Deposit.ewallet_fee_amount,
+            Deposit.total_fees,
+            Deposit.available_fpx,
+            Deposit.available_ewallet,
+            Deposit.available_total,
+        ).outerjoin(
+            Deposit,
             and_(
-                Deposit.merchant == merchant,
-                Deposit.transaction_date.like(f"{date_prefix}%")
+                Deposit.merchant == MerchantLedger.merchant,
+                Deposit.transaction_date == MerchantLedger.transaction_date
             )
-        ).order_by(Deposit.transaction_date).all()
-        
-        deposit_map = {d.transaction_date: d for d in deposits}
-        
-        ledgers = session.query(MerchantLedger).filter(
+        ).filter(
             and_(
                 MerchantLedger.merchant == merchant,
-                MerchantLedger.transaction_date.like(f"{date_prefix}%")
+                MerchantLedger.transaction_date >= month_start,
+                MerchantLedger.transaction_date < month_end
             )
         ).order_by(MerchantLedger.transaction_date).all()
         
-        ledger_map = {lg.transaction_date: lg for lg in ledgers}
-        
-        for ledger in ledgers:
-            deposit = deposit_map.get(ledger.transaction_date)
-            if deposit:
-                ledger.available_fpx = deposit.available_fpx
-                ledger.available_ewallet = deposit.available_ewallet
-                ledger.available_total = deposit.available_total
-        
-        all_dates = set(deposit_map.keys()) | set(ledger_map.keys())
-        
         result = []
-        for date in sorted(all_dates):
-            deposit = deposit_map.get(date)
-            ledger = ledger_map.get(date)
-            
-            if deposit:
-                fpx_gross = round_decimal((deposit.fpx_amount or 0) - (deposit.fpx_fee_amount or 0))
-                ewallet_gross = round_decimal((deposit.ewallet_amount or 0) - (deposit.ewallet_fee_amount or 0))
-                
-                result.append({
-                    'id': ledger.id if ledger else '',
-                    'transaction_date': date,
-                    'fpx_amount': deposit.fpx_amount,
-                    'fpx_fee': deposit.fpx_fee_amount,
+        for row in rows:
+            if row.deposit_id is not None:
+                fpx_gross = round_decimal((row.fpx_amount or 0) - (row.fpx_fee_amount or 0))
+                ewallet_gross = round_decimal((row.ewallet_amount or 0) - (row.ewallet_fee_amount or 0))
+                deposit_data = {
+                    'fpx_amount': row.fpx_amount,
+                    'fpx_fee': row.fpx_fee_amount,
                     'fpx_gross': fpx_gross,
-                    'ewallet_amount': deposit.ewallet_amount,
-                    'ewallet_fee': deposit.ewallet_fee_amount,
+                    'ewallet_amount': row.ewallet_amount,
+                    'ewallet_fee': row.ewallet_fee_amount,
                     'ewallet_gross': ewallet_gross,
                     'total_gross': round_decimal((fpx_gross or 0) + (ewallet_gross or 0)),
-                    'total_fee': deposit.total_fees,
-                    'available_fpx': deposit.available_fpx,
-                    'available_ewallet': deposit.available_ewallet,
-                    'available_total': deposit.available_total,
-                    'settlement_fund': ledger.settlement_fund if ledger else None,
-                    'settlement_charges': ledger.settlement_charges if ledger else None,
-                    'withdrawal_amount': ledger.withdrawal_amount if ledger else None,
-                    'withdrawal_rate': ledger.withdrawal_rate if ledger else None,
-                    'withdrawal_charges': ledger.withdrawal_charges if ledger else None,
-                    'topup_payout_pool': ledger.topup_payout_pool if ledger else None,
-                    'payout_pool_balance': ledger.payout_pool_balance if ledger else None,
-                    'available_balance': ledger.available_balance if ledger else None,
-                    'total_balance': ledger.total_balance if ledger else None,
-                    'remarks': ledger.remarks if ledger else deposit.remarks,
-                    'updated_at': ledger.updated_at if ledger else None,
-                })
-            elif ledger:
-                result.append({
-                    'id': ledger.id,
-                    'transaction_date': date,
+                    'total_fee': row.total_fees,
+                    'available_fpx': row.available_fpx,
+                    'available_ewallet': row.available_ewallet,
+                    'available_total': row.available_total,
+                }
+            else:
+                deposit_data = {
                     'fpx_amount': None,
                     'fpx_fee': None,
                     'fpx_gross': None,
@@ -380,21 +472,27 @@ class MerchantLedgerSheetService:
                     'ewallet_gross': None,
                     'total_gross': None,
                     'total_fee': None,
-                    'available_fpx': ledger.available_fpx,
-                    'available_ewallet': ledger.available_ewallet,
-                    'available_total': ledger.available_total,
-                    'settlement_fund': ledger.settlement_fund,
-                    'settlement_charges': ledger.settlement_charges,
-                    'withdrawal_amount': ledger.withdrawal_amount,
-                    'withdrawal_rate': ledger.withdrawal_rate,
-                    'withdrawal_charges': ledger.withdrawal_charges,
-                    'topup_payout_pool': ledger.topup_payout_pool,
-                    'payout_pool_balance': ledger.payout_pool_balance,
-                    'available_balance': ledger.available_balance,
-                    'total_balance': ledger.total_balance,
-                    'remarks': ledger.remarks,
-                    'updated_at': ledger.updated_at,
-                })
+                    'available_fpx': row.ledger_available_fpx,
+                    'available_ewallet': row.ledger_available_ewallet,
+                    'available_total': row.ledger_available_total,
+                }
+            
+            result.append({
+                'id': row.id,
+                'transaction_date': row.transaction_date,
+                **deposit_data,
+                'settlement_fund': row.settlement_fund,
+                'settlement_charges': row.settlement_charges,
+                'withdrawal_amount': row.withdrawal_amount,
+                'withdrawal_rate': row.withdrawal_rate,
+                'withdrawal_charges': row.withdrawal_charges,
+                'topup_payout_pool': row.topup_payout_pool,
+                'payout_pool_balance': row.payout_pool_balance,
+                'available_balance': row.available_balance,
+                'total_balance': row.total_balance,
+                'remarks': row.remarks,
+                'updated_at': row.updated_at,
+            })
         
         return result
     
@@ -402,36 +500,12 @@ class MerchantLedgerSheetService:
     def _write_to_sheet(cls, data: List[Dict]):
         client = cls.get_client()
         
-        rows = []
-        for rec in data:
-            rows.append([
-                rec.get('id', ''),
-                rec.get('transaction_date', ''),
-                rec.get('fpx_amount') if rec.get('fpx_amount') is not None else 0,
-                rec.get('fpx_fee') if rec.get('fpx_fee') is not None else 0,
-                rec.get('fpx_gross') if rec.get('fpx_gross') is not None else 0,
-                rec.get('ewallet_amount') if rec.get('ewallet_amount') is not None else 0,
-                rec.get('ewallet_fee') if rec.get('ewallet_fee') is not None else 0,
-                rec.get('ewallet_gross') if rec.get('ewallet_gross') is not None else 0,
-                rec.get('total_gross') if rec.get('total_gross') is not None else 0,
-                rec.get('total_fee') if rec.get('total_fee') is not None else 0,
-                rec.get('available_fpx') if rec.get('available_fpx') is not None else 0,
-                rec.get('available_ewallet') if rec.get('available_ewallet') is not None else 0,
-                rec.get('available_total') if rec.get('available_total') is not None else 0,
-                rec.get('settlement_fund') if rec.get('settlement_fund') is not None else '',
-                rec.get('settlement_charges') if rec.get('settlement_charges') is not None else '',
-                rec.get('withdrawal_amount') if rec.get('withdrawal_amount') is not None else '',
-                rec.get('withdrawal_rate') if rec.get('withdrawal_rate') is not None else '',
-                rec.get('withdrawal_charges') if rec.get('withdrawal_charges') is not None else '',
-                rec.get('topup_payout_pool') if rec.get('topup_payout_pool') is not None else '',
-                rec.get('payout_pool_balance') if rec.get('payout_pool_balance') is not None else '',
-                rec.get('available_balance') if rec.get('available_balance') is not None else '',
-                rec.get('total_balance') if rec.get('total_balance') is not None else '',
-                rec.get('updated_at') or '',
-                rec.get('remarks') if rec.get('remarks') is not None else '',
-            ])
+        rows = [
+            [default if value is None else value for value, default in zip(_sheet_row(rec), SHEET_DEFAULTS)]
+            for rec in data
+        ]
         
-        worksheet = client.spreadsheet.worksheet(MERCHANT_LEDGER_SHEET)
+        worksheet = client.worksheet(MERCHANT_LEDGER_SHEET)
         worksheet.batch_clear([DATA_RANGE])
         
         if rows:
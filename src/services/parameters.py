@@ -1,34 +1,45 @@
 from __future__ import annotations
 
+import threading
 from typing import Dict, Set, Any
 
-from sqlalchemy import and_
+from sqlalchemy import or_
+from sqlalchemy.dialects.sqlite import insert
 
 from src.core.database import get_session
 from src.core.models import Parameter
 from src.core.logger import get_logger
+from src.services.client import get_sheets_client
 
 logger = get_logger(__name__)
 
 
 class ParameterService:
     _cache = None
+    _cache_lock = threading.Lock()
     
     @classmethod
     def load_parameters(cls) -> Dict[str, Set[str]]:
-        if cls._cache is None:
-            cls._cache = cls._fetch_from_db()
-        return cls._cache
+        cache = cls._cache
+        if cache is None:
+            with cls._cache_lock:
+                if cls._cache is None:
+                    cls._cache = cls._fetch_from_db()
+                cache = cls._cache
+        return cache
     
     @classmethod
     def clear_cache(cls):
-        cls._cache = None
+        with cls._cache_lock:
+            cls._cache = None
     
     @staticmethod
     def _fetch_from_db() -> Dict[str, Set[str]]:
         session = get_session()
         try:
-            params = session.query(Parameter).all()
+            params = session.query(Parameter.type, Parameter.key).filter(
+                Parameter.type.in_(['ADD_ON_HOLIDAY', 'EXCLUDE_HOLIDAY'])
+            ).all()
             add_on_holidays = set()
             exclude_holidays = set()
             for p in params:
@@ -45,9 +56,7 @@ class ParameterService:
     
     @classmethod
     def sync_from_sheet(cls) -> int:
-        from src.services.client import SheetsClient
-        
-        client = SheetsClient()
+        client = get_sheets_client()
         session = get_session()
         
         try:
@@ -74,7 +83,8 @@ class ParameterService:
             value_idx = headers.index('Value') if 'Value' in headers else 3
             desc_idx = headers.index('Description') if 'Description' in headers else 4
             
-            sheet_params = set()
+            existing = session.query(Parameter.id, Parameter.type, Parameter.key).all()
+            sheet_params: Dict[tuple, Dict[str, str]] = {}
             count = 0
             
             for row in data[header_row_idx + 1:]:
@@ -82,39 +92,42 @@ class ParameterService:
                     continue
                 
                 param_type = str(row[type_idx]).strip() if len(row) > type_idx else ''
-                param_key = str(row[key_idx]).strip().lower() if len(row) > key_idx else ''
-                param_value = str(row[value_idx]).strip() if len(row) > value_idx else ''
-                param_desc = str(row[desc_idx]).strip() if len(row) > desc_idx else ''
-                
-                if not param_type or not param_key or param_key == '-':
+                if not param_type:
                     continue
                 
-                sheet_params.add((param_type, param_key))
-                
-                existing = session.query(Parameter).filter(
-                    and_(
-                        Parameter.type == param_type,
-                        Parameter.key == param_key
-                    )
-                ).first()
+                param_key = str(row[key_idx]).strip().lower() if len(row) > key_idx else ''
+                if not param_key or param_key == '-':
+                    continue
                 
-                if existing:
-                    existing.value = param_value
-                    existing.description = param_desc
-                else:
-                    session.add(Parameter(
-                        type=param_type,
-                        key=param_key,
-                        value=param_value,
-                        description=param_desc
-                    ))
+                param_value = str(row[value_idx]).strip() if len(row) > value_idx else ''
+                param_desc = str(row[desc_idx]).strip() if len(row) > desc_idx else ''
                 
+                sheet_params[(param_type, param_key)] = {
+                    'type': param_type,
+                    'key': param_key,
+                    'value': param_value,
+                    'description': param_desc,
+                }
                 count += 1
             
-            existing_all = session.query(Parameter).all()
-            for p in existing_all:
-                if (p.type, p.key) not in sheet_params:
-                    session.delete(p)
+            if sheet_params:
+                stmt = insert(Parameter)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=['type', 'key'],
+                    set_={col: stmt.excluded[col] for col in ('value', 'description', 'updated_at')},
+                    where=or_(
+                        Parameter.value.is_distinct_from(stmt.excluded['value']),
+                        Parameter.description.is_distinct_from(stmt.excluded['description'])
+                    )
+                )
+                session.execute(stmt, list(sheet_params.values()))
+            
+            stale = [p for p in existing if (p.type, p.key) not in sheet_params]
+            if stale:
+                session.query(Parameter).filter(
+                    Parameter.id.in_([p.id for p in stale])
+                ).delete(synchronize_session=False)
+                for p in stale:
                     logger.info(f"Deleted parameter: {p.type}/{p.key}")
             
             session.commit()
@@ -134,7 +147,9 @@ class ParameterService:
         session = get_session()
 
         try:
-            params = session.query(Parameter).all()
+            params = session.query(Parameter.type, Parameter.key, Parameter.description).filter(
+                Parameter.type.in_(['ADD_ON_HOLIDAY', 'EXCLUDE_HOLIDAY'])
+            ).all()
 
             add_on_holidays = []
             exclude_holidays = []
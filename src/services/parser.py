@@ -10,9 +10,11 @@ from src.parser.axai import AxaiParser
 from src.parser.kira import KiraParser
 from src.services.kira_pg import init_kira_pg, KiraPGSheetService
 from src.services.deposit import init_deposit, DepositSheetService
-from src.services.merchant_ledger import init_merchant_ledger, MerchantLedgerSheetService
-from src.services.agent_ledger import init_agent_ledger, AgentLedgerSheetService
+from src.services.merchant_ledger import init_merchant_ledgers, MerchantLedgerSheetService
+from src.services.agent_ledger import init_agent_ledgers, AgentLedgerSheetService
+from src.services.client import get_sheets_client
 from src.services.parameters import ParameterService
+from src.utils.helpers import MONTHS
 
 logger = get_logger(__name__)
 
@@ -130,14 +132,17 @@ def _init_ledgers():
             for merchant in sorted(merchants):
                 periods.append((merchant, year, month))
         
-        for merchant, year, month in periods:
-            try:
-                init_merchant_ledger(merchant, year, month)
-                init_agent_ledger(merchant, year, month)
-            except Exception as e:
-                logger.error(f"Failed to init ledger for {merchant} {year}-{month}: {e}")
+        try:
+            init_merchant_ledgers(periods)
+        except Exception as e:
+            logger.error(f"Failed to initialize merchant ledgers: {e}")
+        
+        try:
+            init_agent_ledgers(periods)
+        except Exception as e:
+            logger.error(f"Failed to initialize agent ledgers: {e}")
         
-        logger.info(f"Initialized ledgers for {len(periods)} merchant-periods")
+        logger.info(f"Ledger init finished for {len(periods)} merchant-periods")
         
     except Exception as e:
         logger.error(f"Failed to initialize ledgers: {e}")
@@ -154,17 +159,11 @@ def _get_dropdown_data() -> dict:
             func.substr(KiraTransaction.transaction_date, 1, 7).label('ym')
         ).distinct().all()
         
-        months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                  'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-        
-        periods = []
-        for rec in year_months:
-            if rec.ym:
-                year = rec.ym[:4]
-                month_num = int(rec.ym[5:7])
-                periods.append(f"{months[month_num-1]} {year}")
-        
-        periods.sort(key=lambda x: (x.split()[1], months.index(x.split()[0])))
+        month_names = list(MONTHS)
+        periods = [
+            f"{month_names[int(ym[5:7]) - 1]} {ym[:4]}"
+            for ym in sorted(rec.ym for rec in year_months if rec.ym)
+        ]
         
         return {
             'merchants': merchants,
@@ -176,9 +175,7 @@ def _get_dropdown_data() -> dict:
 
 def _setup_dropdowns(merchants: list, periods: list):
     try:
-        from src.services.client import SheetsClient
-        
-        client = SheetsClient()
+        client = get_sheets_client()
         
         client.set_dropdown('Kira PG', 'B1', periods)
         
@@ -3,7 +3,7 @@ from __future__ import annotations
 import threading
 import time
 import uuid
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Set
 
 from src.core import load_accounts
 from src.core.jobs import job_manager
@@ -187,28 +187,29 @@ def _run_parse_only(run_id: str):
         _current_run_id = None
 
 
-def _is_account_completed(account_label: str, from_date: str, to_date: str) -> bool:
+def _get_completed_accounts(account_labels: List[str], from_date: str, to_date: str) -> Set[str]:
     from src.core.database import get_session
     from src.core.models import Job
     
     session = get_session()
     try:
-        job = session.query(Job).filter(
+        rows = session.query(Job.account_label).filter(
             Job.job_type == 'download',
-            Job.account_label == account_label,
+            Job.account_label.in_(account_labels),
             Job.from_date == from_date,
             Job.to_date == to_date,
             Job.status == 'completed'
-        ).first()
-        return job is not None
+        ).distinct().all()
+        return {row[0] for row in rows}
     finally:
         session.close()
 
 
 def _create_download_jobs(run_id: str, accounts: list, from_date: str, to_date: str, platform_group: str) -> List[Tuple[int, dict, str, str]]:
     jobs = []
+    completed = _get_completed_accounts([a['label'] for a in accounts], from_date, to_date)
     for account in accounts:
-        if _is_account_completed(account['label'], from_date, to_date):
+        if account['label'] in completed:
             logger.info(f"Skipping {account['label']}: already completed for {from_date} - {to_date}")
             continue
         
@@ -3,6 +3,8 @@ from __future__ import annotations
 from datetime import datetime, timedelta, date
 from typing import Tuple, Optional, Dict
 
+from sqlalchemy import func
+
 from src.core.database import get_session
 from src.core.loader import get_timezone, load_settings
 from src.core.models import Job
@@ -79,6 +81,19 @@ class DateRangeService:
             accounts = load_accounts()
             progress = {}
             
+            latest_jobs = session.query(
+                Job.platform,
+                Job.account_label,
+                func.max(Job.to_date)
+            ).filter(
+                Job.job_type == 'download',
+                Job.status == 'completed'
+            ).group_by(
+                Job.platform,
+                Job.account_label
+            ).all()
+            latest_to_date = {(platform, label): to_date for platform, label, to_date in latest_jobs}
+            
             for platform in PLATFORMS:
                 platform_accounts = [a['label'] for a in accounts if a['platform'] == platform]
                 
@@ -87,15 +102,10 @@ class DateRangeService:
                 
                 account_progress = {}
                 for acc_label in platform_accounts:
-                    job = session.query(Job).filter(
-                        Job.job_type == 'download',
-                        Job.platform == platform,
-                        Job.account_label == acc_label,
-                        Job.status == 'completed'
-                    ).order_by(Job.to_date.desc()).first()
+                    to_date = latest_to_date.get((platform, acc_label))
                     
-                    if job and job.to_date:
-                        account_progress[acc_label] = datetime.strptime(job.to_date, '%Y-%m-%d').date()
+                    if to_date:
+                        account_progress[acc_label] = datetime.strptime(to_date, '%Y-%m-%d').date()
                 
                 if not account_progress:
                     continue
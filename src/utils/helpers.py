@@ -1,4 +1,9 @@
 import re
+from calendar import monthrange
+from typing import List, Set
+
+from sqlalchemy import and_, case, func
+from sqlalchemy.dialects.sqlite import insert
 
 
 MONTHS = {
@@ -7,13 +12,8 @@ MONTHS = {
 }
 
 
-def categorize_channel(channel: str) -> str:
-    if not channel:
-        return 'EWALLET'
-    ch_upper = channel.upper().strip()
-    if ch_upper in ('FPX', 'FPXC') or 'FPX' in ch_upper:
-        return 'FPX'
-    return 'EWALLET'
+def categorize_channel_expr(column):
+    return case((func.upper(column).like('%FPX%'), 'FPX'), else_='EWALLET')
 
 
 def round_decimal(value: float) -> float:
@@ -21,6 +21,14 @@ def round_decimal(value: float) -> float:
 
 
 def to_float(value):
+    value_type = type(value)
+    if value_type is float:
+        return value
+    if value_type is str:
+        try:
+            return float(value)
+        except ValueError:
+            pass
     if value is None:
         return None
     if isinstance(value, (int, float)):
@@ -62,6 +70,45 @@ def parse_period(period_str: str) -> tuple:
     return year, month
 
 
+def month_bounds(year: int, month: int) -> tuple:
+    if month == 12:
+        return f"{year}-12-01", f"{year + 1}-01-01"
+    return f"{year}-{month:02d}-01", f"{year}-{month + 1:02d}-01"
+
+
+def missing_month_dates(existing_dates: Set[str], year: int, month: int) -> List[str]:
+    date_prefix = f"{year}-{month:02d}"
+    _, last_day = monthrange(year, month)
+    month_dates = {f"{date_prefix}-{day:02d}" for day in range(1, last_day + 1)}
+    return sorted(month_dates - existing_dates)
+
+
+def missing_days_insert(model, key_column: str):
+    return insert(model.__table__).on_conflict_do_nothing(
+        index_elements=[key_column, 'transaction_date']
+    )
+
+
+def insert_missing_days(session, model, key_column: str, key: str, year: int, month: int):
+    month_start, month_end = month_bounds(year, month)
+    
+    existing = session.query(model.transaction_date).filter(
+        and_(
+            getattr(model, key_column) == key,
+            model.transaction_date >= month_start,
+            model.transaction_date < month_end
+        )
+    ).all()
+    
+    missing_dates = missing_month_dates({rec[0] for rec in existing}, year, month)
+    
+    if missing_dates:
+        session.execute(missing_days_insert(model, key_column), [
+            {key_column: key, 'transaction_date': date_str}
+            for date_str in missing_dates
+        ])
+
+
 def calculate_fee(fee_type: str, fee_rate: float, amount: float, volume: int) -> float:
     if not fee_type or fee_rate is None:
         return 0
@@ -1,13 +1,14 @@
 import re
 import requests
-from datetime import datetime, timedelta
-from typing import Set
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import FrozenSet, Set
 
-from src.core.loader import get_timezone
 from src.core.logger import get_logger
 
 logger = get_logger(__name__)
 MALAYSIA_HOLIDAYS_URL = "https://calendar.google.com/calendar/ical/en.malaysia%23holiday@group.v.calendar.google.com/public/basic.ics"
+ONE_DAY = timedelta(days=1)
 
 
 _holidays_cache = None
@@ -63,6 +64,19 @@ def format_date_string(date: datetime) -> str:
     return date.strftime('%Y-%m-%d')
 
 
+def merge_holidays(
+    holiday_set: Set[str],
+    add_on_holidays: Set[str] = None,
+    exclude_holidays: Set[str] = None
+) -> FrozenSet[str]:
+    all_holidays = frozenset(holiday_set or ())
+    if exclude_holidays:
+        all_holidays = all_holidays - exclude_holidays
+    if add_on_holidays:
+        all_holidays = all_holidays | add_on_holidays
+    return all_holidays
+
+
 def calculate_settlement_date(
     transaction_date_str: str, 
     settlement_rule: str, 
@@ -73,6 +87,12 @@ def calculate_settlement_date(
     if not transaction_date_str or not settlement_rule:
         return ''
     
+    all_holidays = merge_holidays(holiday_set, add_on_holidays, exclude_holidays)
+    return _settlement_date(transaction_date_str, settlement_rule, all_holidays)
+
+
+@lru_cache(maxsize=4096)
+def _settlement_date(transaction_date_str: str, settlement_rule: str, all_holidays: FrozenSet[str]) -> str:
     match = re.match(r'T\+(\d+)', settlement_rule, re.IGNORECASE)
     if not match:
         return ''
@@ -85,27 +105,20 @@ def calculate_settlement_date(
             return ''
         
         year, month, day = map(int, date_parts)
-        current_date = datetime(year, month, day, tzinfo=get_timezone())
+        current_date = date(year, month, day)
     except Exception:
         return ''
     
-    all_holidays = set(holiday_set) if holiday_set else set()
-    if exclude_holidays:
-        all_holidays = all_holidays - exclude_holidays
-    if add_on_holidays:
-        all_holidays = all_holidays.union(add_on_holidays)
-    
     business_days_added = 0
     while business_days_added < days_to_add:
-        current_date += timedelta(days=1)
-        current_date_str = format_date_string(current_date)
+        current_date += ONE_DAY
         
-        if not is_weekend(current_date) and not is_holiday(current_date_str, all_holidays):
+        if not is_weekend(current_date) and not is_holiday(current_date.isoformat(), all_holidays):
             business_days_added += 1
     
-    settlement_date_str = format_date_string(current_date)
+    settlement_date_str = current_date.isoformat()
     while is_weekend(current_date) or is_holiday(settlement_date_str, all_holidays):
-        current_date += timedelta(days=1)
-        settlement_date_str = format_date_string(current_date)
+        current_date += ONE_DAY
+        settlement_date_str = current_date.isoformat()
     
     return settlement_date_str